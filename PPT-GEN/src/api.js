@@ -33,21 +33,51 @@ export const generatePresentation = async (data) => {
 };
 
 /**
- * Get information about the current presentation
- * @returns {Promise<Object>} The presentation information
+ * Generate a presentation and follow its progress as Server-Sent Events
+ * @param {Object} data - The presentation data (topic, template, includeCode)
+ * @param {Function} onEvent - Called with (eventName, payload) for every stage event;
+ *   a job that fails sends 'failed' with { error }
+ * @returns {EventSource} The open stream; call close() to stop listening.
+ *   Its onerror fires when the stream cannot be opened (e.g. 429 or 503) or drops
  */
-export const getResultInfo = async () => {
+export const streamPresentation = (data, onEvent) => {
+  const params = new URLSearchParams({
+    topic: data.topic,
+    template: data.template ?? 1,
+    includeCode: data.includeCode ? 'true' : 'false',
+  });
+  const source = new EventSource(`${API_URL}/generate/stream?${params}`);
+  const stages = ['queued', 'started', 'summary', 'code', 'outline_token', 'outline', 'image', 'slide', 'saved', 'done', 'failed'];
+
+  stages.forEach((stage) => {
+    source.addEventListener(stage, (event) => {
+      onEvent(stage, event.data ? JSON.parse(event.data) : {});
+      if (stage === 'done' || stage === 'failed') {
+        source.close();
+      }
+    });
+  });
+
+  return source;
+};
+
+/**
+ * Get the status of a queued generation job
+ * @param {string} jobId - The job ID returned by generatePresentation
+ * @returns {Promise<Object>} The job status (and presentation info once done)
+ */
+export const getJobStatus = async (jobId) => {
   try {
-    const response = await fetch(`${API_URL}/result`);
+    const response = await fetch(`${API_URL}/jobs/${jobId}`);
 
     if (!response.ok) {
       const errorData = await response.json();
-      throw new Error(errorData.error || 'Failed to get presentation info');
+      throw new Error(errorData.error || 'Failed to get job status');
     }
 
     return await response.json();
   } catch (error) {
-    console.error('Error in getResultInfo:', error);
+    console.error('Error in getJobStatus:', error);
     throw error;
   }
 };
@@ -63,6 +93,7 @@ export const getDownloadUrl = (presentationId) => {
 
 export default {
   generatePresentation,
-  getResultInfo,
+  streamPresentation,
+  getJobStatus,
   getDownloadUrl
 };
\ No newline at end of file
@@ -1,30 +1,62 @@
 import React, { useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { generatePresentation } from "../api";
+import { streamPresentation } from "../api";
 import Navbar from "../components/Navbar";
 
 const Home = () => {
   const [topic, setTopic] = useState("");
   const [template, setTemplate] = useState(1);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState("");
   const navigate = useNavigate();
 
-  const handleSubmit = async (e) => {
+  const stageMessages = {
+    queued: () => "Queued...",
+    started: () => "Starting generation...",
+    summary: () => "Summary written",
+    code: () => "Code example written",
+    outline_token: () => "Writing slide outline...",
+    outline: () => "Outline ready, fetching images...",
+    image: (data) => `Image ready for slide ${data.slide + 1}`,
+    slide: (data) => `Rendered slide: ${data.title}`,
+    saved: () => "Saving presentation...",
+  };
+
+  const handleSubmit = (e) => {
     e.preventDefault();
     setLoading(true);
+    setProgress("Queued...");
 
-    try {
-      const data = { topic, template };
-      const result = await generatePresentation(data);
-      console.log(result.message);
-      if (result.message === "Presentation created successfully!") {
-        navigate("/result");
+    let jobId = null;
+    const source = streamPresentation({ topic, template }, (stage, data) => {
+      if (stage === "queued") {
+        jobId = data.job_id;
+      }
+      if (stage === "done") {
+        setLoading(false);
+        navigate(`/result?job=${jobId}`);
+      } else if (stage === "failed") {
+        console.error("Error creating presentation:", data.error);
+        setProgress(`Error: ${data.error}`);
+        setLoading(false);
+      } else if (stageMessages[stage]) {
+        setProgress(stageMessages[stage](data));
       }
-    } catch (error) {
-      console.error("Error creating presentation:", error);
-    } finally {
+    });
+
+    // Never let EventSource reconnect here: that would queue a second job.
+    // If the stream drops, keep following the job by polling on the result page.
+    // With no job yet, the request itself was refused (429 busy / 503 shutting
+    // down) or the server is unreachable; EventSource cannot tell which.
+    source.onerror = () => {
+      source.close();
       setLoading(false);
-    }
+      if (jobId) {
+        navigate(`/result?job=${jobId}`);
+      } else {
+        setProgress("Error: the server is busy or unavailable. Please try again in a moment.");
+      }
+    };
   };
 
   return (
@@ -93,6 +125,11 @@ const Home = () => {
             >
               {loading ? "⏳ Generating..." : "🚀 Generate Presentation"}
             </button>
+
+            {/* ✅ Live progress */}
+            {progress && (
+              <p className="text-white/80 text-center text-sm">{progress}</p>
+            )}
           </form>
         </div>
       </div>
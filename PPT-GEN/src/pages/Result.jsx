@@ -1,7 +1,7 @@
 // src/pages/Result.jsx
 import React, { useEffect, useState } from 'react';
-import { useNavigate } from 'react-router-dom';
-import { getResultInfo, getDownloadUrl } from '../api';
+import { useNavigate, useSearchParams } from 'react-router-dom';
+import { getJobStatus, getDownloadUrl } from '../api';
 import Navbar from '../components/Navbar';
 
 const Result = () => {
@@ -9,22 +9,47 @@ const Result = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
+  const [searchParams] = useSearchParams();
+  const jobId = searchParams.get('job');
 
   useEffect(() => {
-    const fetchPresentationInfo = async () => {
+    let timer = null;
+    let cancelled = false;
+
+    const pollJob = async () => {
       try {
-        const info = await getResultInfo();
-        setPresentationInfo(info);
+        const info = await getJobStatus(jobId);
+        if (cancelled) return;
+        if (info.status === 'done') {
+          setPresentationInfo(info);
+          setLoading(false);
+        } else if (info.status === 'failed') {
+          setError(info.error || 'Presentation generation failed. Please try again.');
+          setLoading(false);
+        } else {
+          timer = setTimeout(pollJob, 3000);
+        }
       } catch (err) {
         console.error('Error fetching presentation info:', err);
-        setError('Could not load presentation information. Please try again.');
-      } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setError('Could not load presentation information. Please try again.');
+          setLoading(false);
+        }
       }
     };
 
-    fetchPresentationInfo();
-  }, []);
+    if (jobId) {
+      pollJob();
+    } else {
+      setError('No presentation job was specified.');
+      setLoading(false);
+    }
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [jobId]);
 
   const handleCreateAnother = () => {
     navigate('/');
@@ -1,60 +1,294 @@
 import os
-import glob
+import math
+import shutil
+import tempfile
+import threading
+from urllib.parse import urlparse
 import requests
-from pexels_api import API
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from dotenv import load_dotenv
-load_dotenv("project.env")
-# Ensure images directory exists
-IMAGE_DIR = "./images/"
-os.makedirs(IMAGE_DIR, exist_ok=True)
+import config
+import imagecache
+import metrics
 
-def get_images(query, n):
-    client = API('5JV9cVZRTr6VUv9pqbYDWvxlluf7DvAtm1B8xL7VJvVia9ULckKbnYfc')  # Initialize API with key
+# Size of the picture box create_presentation places images in (width, height)
+IMAGE_BOX_INCHES = (3, 4)
+
+# Pexels renditions that keep the whole photo, with the box each is fitted into
+# (None means that side is unconstrained). Listed smallest first.
+RENDITIONS = [
+    ("small", None, 130),
+    ("medium", None, 350),
+    ("large", 940, 650),
+    ("large2x", 1880, 1300),
+]
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide HTTP session with keep-alive connection pooling."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                                allowed_methods=("GET", "HEAD"))
+                adapter = HTTPAdapter(pool_connections=config.HTTP_POOL_CONNECTIONS,
+                                      pool_maxsize=config.HTTP_POOL_MAXSIZE,
+                                      max_retries=retries)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_image_cache():
+    """Process-wide image cache, opened on first use (None when disabled)."""
+    global _image_cache
+    if not config.IMAGE_CACHE_ENABLED:
+        return None
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = imagecache.ImageCache(config.IMAGE_CACHE_DIR, max_bytes=config.IMAGE_CACHE_MAX_BYTES)
+        return _image_cache
+
+
+def _timeout():
+    return (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+
+
+def _host_slot(url):
+    """Semaphore limiting how many requests run against one host at a time."""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(config.IMAGE_PER_HOST_LIMIT)
+    return slot
+
+
+def search_photos(query, n):
+    """Run a Pexels search and return the decoded JSON response."""
+    url = f"{config.PEXELS_API_URL}/search"
+    with metrics.timed("image_search"), _host_slot(url):
+        response = get_session().get(
+            url,
+            params={"query": query, "per_page": n, "page": 1},
+            headers={"Authorization": config.PEXELS_API_KEY},
+            timeout=_timeout(),
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+def target_pixels(box_inches=IMAGE_BOX_INCHES, dpi=None):
+    """Pixel size needed to fill a box of `box_inches` at `dpi`."""
+    dpi = dpi or config.IMAGE_DPI
+    return math.ceil(box_inches[0] * dpi), math.ceil(box_inches[1] * dpi)
+
+
+def choose_rendition(photo, target_size):
+    """URL of the smallest rendition of a Pexels photo that still covers target_size."""
+    target_width, target_height = target_size
+    width, height = photo.get("width"), photo.get("height")
+    if width and height:
+        for name, max_width, max_height in RENDITIONS:
+            url = photo["src"].get(name)
+            if not url:
+                continue
+            scale = min(max_width / width if max_width else 1,
+                        max_height / height if max_height else 1,
+                        1)
+            if width * scale >= target_width and height * scale >= target_height:
+                return url
+    return photo["src"]["original"]
+
+
+def shrink_image(image_path, target_size):
+    """Downscale and re-encode an image so it just covers target_size.
+
+    Returns the path of the result, which changes extension when the image
+    is re-encoded (photos become JPEG, images with transparency stay PNG).
+    """
+    from PIL import Image  # only needed once images are downloaded
+    target_width, target_height = target_size
+    with Image.open(image_path) as img:
+        img.load()
+        scale = max(target_width / img.width, target_height / img.height)
+        if scale < 1:
+            img = img.resize((math.ceil(img.width * scale), math.ceil(img.height * scale)), Image.LANCZOS)
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            new_path = os.path.splitext(image_path)[0] + ".png"
+            save_args = {"format": "PNG", "optimize": True}
+        else:
+            img = img.convert("RGB")
+            new_path = os.path.splitext(image_path)[0] + ".jpg"
+            save_args = {"format": "JPEG", "quality": config.IMAGE_JPEG_QUALITY, "optimize": True}
+        partial_path = f"{new_path}.part"
+        img.save(partial_path, **save_args)
+
+    # Keep whichever file is smaller
+    if os.path.getsize(partial_path) >= os.path.getsize(image_path):
+        os.remove(partial_path)
+        return image_path
+    os.replace(partial_path, new_path)
+    if new_path != image_path:
+        os.remove(image_path)
+    return new_path
+
+
+def _add_stats(stats, downloaded, embedded):
+    metrics.IMAGE_BYTES.inc(downloaded, kind="downloaded")
+    metrics.IMAGE_BYTES.inc(embedded, kind="embedded")
+    if stats is not None:
+        with _stats_lock:
+            stats["downloaded_bytes"] = stats.get("downloaded_bytes", 0) + downloaded
+            stats["embedded_bytes"] = stats.get("embedded_bytes", 0) + embedded
+
+
+def download_image(image_url, image_path):
+    """Stream image_url to image_path; returns the path, or None if it is not an image."""
+    with metrics.timed("image_download"), _host_slot(image_url):
+        response = get_session().get(image_url, stream=True, timeout=_timeout())
+        try:
+            if response.status_code != 200 or "image" not in response.headers.get("Content-Type", ""):
+                print(f"Skipping {image_url} - Not a valid image")
+                return None
+            # Write next to the target and rename so readers never see half a file
+            partial_path = f"{image_path}.part"
+            with open(partial_path, "wb") as file:
+                for chunk in response.iter_content(config.IMAGE_CHUNK_SIZE):
+                    file.write(chunk)
+            os.replace(partial_path, image_path)
+        finally:
+            response.close()
+    print(f"Downloaded: {image_path}")
+    return image_path
+
+
+def _into_workspace(path, workspace):
+    """Hard-link (or copy) a cached image into the job workspace.
+
+    The job then holds its own reference, so cache eviction cannot remove
+    an image between download and embedding.
+    """
+    target = os.path.join(workspace, os.path.basename(path))
+    if os.path.exists(target):
+        return target
+    try:
+        os.link(path, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        fd, partial_path = tempfile.mkstemp(dir=workspace, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(path, partial_path)
+        os.replace(partial_path, target)
+    return target
+
+
+def warm_up():
+    """Open a pooled connection to the Pexels API before the first request."""
     try:
-        client.search(query, results_per_page=n, page=1)  # Perform search
-        response_data = client.json  # Get API response
+        get_session().head(config.PEXELS_API_URL, timeout=_timeout())
+    except requests.RequestException as e:
+        print(f"Pexels warm-up failed: {e}")
+
+
+def get_images(query, n, workspace, stats=None):
+    """Download up to n images for query into `workspace`, sized for the slide picture box.
+
+    If `stats` is a dict, the bytes downloaded and the bytes left after
+    downscaling are added to its "downloaded_bytes" / "embedded_bytes".
+    Results come from the shared image cache when the same query (or the
+    same photo) was fetched before.
+    """
+    target_size = target_pixels()
+    cache = get_image_cache()
+    # Cached files are already downscaled, so the box size is part of the key
+    size_tag = f"{target_size[0]}x{target_size[1]}"
+    cache_query = f"{query} @{size_tag}"
+    if cache is not None:
+        cached = cache.lookup(cache_query, n)
+        metrics.CACHE_LOOKUPS.inc(cache="image", result="miss" if cached is None else "hit")
+        if cached is not None:
+            print(f"Image cache hit: {query}")
+            return [_into_workspace(path, workspace) for path in cached]
+
+    try:
+        response_data = search_photos(query, n)  # Perform search
         
         if "photos" not in response_data or not response_data["photos"]:
             print(f"No images found for query: {query}")
             return []
         
         filenames = []
-        image_urls = []
-        imagePath=[]
-        for photo in response_data["photos"][:n]:
+        for position, photo in enumerate(response_data["photos"][:n]):
+            image_url = choose_rendition(photo, target_size)
+            photo_key = f"{photo.get('id') or image_url}@{size_tag}"
             try:
-                image_url = photo["src"]["original"]
-                image_name = os.path.basename(image_url)
-                image_path = os.path.join(IMAGE_DIR, image_name)
-                imagePath.append(image_path)
+                cached_path = cache.get_photo(photo_key) if cache is not None else None
+                if cached_path:
+                    cache.remember(cache_query, position, photo_key)
+                    filenames.append(_into_workspace(cached_path, workspace))
+                    continue
+                # Unique name per download; several queries can resolve to the same photo
+                extension = os.path.splitext(urlparse(image_url).path)[1]
+                fd, image_path = tempfile.mkstemp(dir=workspace, prefix="image-", suffix=extension)
+                os.close(fd)
                 # Print the image URL
                 print(f"Image URL: {image_url}")
-                image_urls.append(image_url)
-                
-                # Download image using requests
-                response = requests.get(image_url, stream=True)
-                if response.status_code == 200 and "image" in response.headers.get("Content-Type", ""):
-                    with open(image_path, "wb") as file:
-                        for chunk in response.iter_content(1024):
-                            file.write(chunk)
-                    print(f"Downloaded: {image_path}")
+                if download_image(image_url, image_path):
+                    downloaded = os.path.getsize(image_path)
+                    try:
+                        image_path = shrink_image(image_path, target_size)
+                    except Exception as e:
+                        print(f"Could not downscale {image_path}: {e}")
+                    _add_stats(stats, downloaded, os.path.getsize(image_path))
+                    if cache is not None:
+                        image_path = _into_workspace(cache.store(photo_key, image_path), workspace)
+                        cache.remember(cache_query, position, photo_key)
                     filenames.append(image_path)
-                else:
-                    print(f"Skipping {image_url} - Not a valid image")
             except Exception as e:
                 print(f"Error downloading {image_url}: {e}")
 
-        return imagePath
+        return filenames
     except Exception as e:
         print(f"Error fetching images for query '{query}': {e}")
-        return [], []
+        return []
 
-def empty_images():
+
+def _first_image(query, workspace, stats):
     try:
-        file_list = glob.glob(os.path.join(IMAGE_DIR, "*"))
-        for file_path in file_list:
-            os.remove(file_path)
-        print("Image directory cleaned.")
+        images = get_images(query, 1, workspace, stats)
     except Exception as e:
-        print(f"Error cleaning image directory: {e}")
+        print(f"Error getting image for '{query}': {e}")
+        return None
+    return images[0] if images else None
+
+
+def submit_images(pool, queries, workspace, stats=None, on_result=None):
+    """Start one image fetch per query on `pool` without waiting.
+
+    Returns key -> Future resolving to an image path or None (futures never
+    raise). on_result(key, path) is called from the pool as each one finishes.
+    """
+    futures = {}
+    for key, query in queries.items():
+        # Downloads count towards the timings of the request that started them
+        future = pool.submit(metrics.propagate(_first_image), query, workspace, stats)
+        if on_result is not None:
+            future.add_done_callback(
+                lambda done, key=key: None if done.cancelled() else on_result(key, done.result()))
+        futures[key] = future
+    return futures
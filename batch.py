@@ -0,0 +1,196 @@
+"""Generate many decks from a topic manifest.
+
+    python batch.py topics.csv --out batch_output --workers 4
+
+The manifest is CSV or JSONL with `topic` and optional `template`,
+`includeCode`, `mode` and `id` fields. Decks are generated by a process pool
+whose workers share one Gemini rate budget, held by a manager process. Each
+finished entry is appended to the results manifest (JSONL) straight away,
+so an interrupted run can simply be started again: entries already done,
+with their deck still on disk, are skipped.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.managers import BaseManager
+
+import config
+import ratelimit
+
+
+class LimiterManager(BaseManager):
+    """Serves the RateLimiter every worker process draws on."""
+
+
+LimiterManager.register("RateLimiter", ratelimit.RateLimiter)
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60] or "deck"
+
+
+def read_manifest(path):
+    """Manifest entries as dicts with id, topic, template, include_code and mode."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    entries = []
+    for number, row in enumerate(rows, 1):
+        topic = row.get("topic")
+        if not topic:
+            print(f"Skipping manifest row {number}: no topic")
+            continue
+        template = int(row.get("template") or 1)
+        include_code = _flag(row.get("includeCode", False))
+        mode = row.get("mode") or None
+        entry_id = row.get("id")
+        if not entry_id:
+            # Stable across runs, so resuming recognises the entry
+            key = json.dumps([topic, template, include_code, mode])
+            entry_id = f"{_slug(str(topic))}-{hashlib.sha1(key.encode()).hexdigest()[:8]}"
+        entries.append({"id": str(entry_id), "topic": topic, "template": template,
+                        "include_code": include_code, "mode": mode})
+    return entries
+
+
+def read_results(path):
+    """Latest result per entry ID from a results manifest."""
+    results = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    result = json.loads(line)
+                    results[result["id"]] = result
+    return results
+
+
+def _init_worker(limiter):
+    import gpt
+    gpt.limiter = ratelimit.ProxyLimiter(limiter)
+
+
+def _generate(entry, out_dir):
+    """Build one deck in a worker process and write it straight into out_dir."""
+    import pptgen
+
+    stage_times = {}
+    start = time.perf_counter()
+
+    def progress(event, **data):
+        # Last time each stage reported, relative to the start of the deck
+        if event in ("outline", "image", "saved"):
+            stage_times[event] = time.perf_counter() - start
+
+    result = {"id": entry["id"], "topic": entry["topic"], "started_at": time.time()}
+    try:
+        output = os.path.join(out_dir, f"{entry['id']}.pptx")
+        with open(output + ".part", "wb") as file:
+            deck = pptgen.create_presentation(entry["topic"], entry["template"], entry["include_code"],
+                                              True, None, entry["mode"], progress=progress, output=file)
+        os.replace(output + ".part", output)
+        result.update(status="done", output=output, bytes=os.path.getsize(output),
+                      presentation_id=deck["id"])
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = time.perf_counter() - start
+    result["stage_seconds"] = _stage_seconds(stage_times)
+    return result
+
+
+def _duration(stage_times, begin, end):
+    if end not in stage_times:
+        return None
+    return stage_times[end] - stage_times.get(begin, 0.0)
+
+
+def _stage_seconds(stage_times):
+    """How long each stage took: text until the (last) outline, then images
+    and rendering, which run at the same time, from there until the last
+    image arrived and until the deck was saved."""
+    return {
+        "text": _duration(stage_times, None, "outline"),
+        "images": _duration(stage_times, "outline", "image"),
+        "render": _duration(stage_times, "outline", "saved"),
+    }
+
+
+def run(manifest, out_dir, results_path, workers, retry_failed=True):
+    os.makedirs(out_dir, exist_ok=True)
+    entries = read_manifest(manifest)
+    previous = read_results(results_path)
+
+    pending = []
+    for entry in entries:
+        done = previous.get(entry["id"])
+        if done and done.get("status") == "done" and os.path.exists(done.get("output", "")):
+            continue
+        if done and done.get("status") == "failed" and not retry_failed:
+            continue
+        pending.append(entry)
+    print(f"{len(entries)} entries, {len(entries) - len(pending)} already done, {len(pending)} to generate")
+    if not pending:
+        return []
+
+    manager = LimiterManager()
+    manager.start()
+    limiter = manager.RateLimiter(config.GEMINI_REQUESTS_PER_MINUTE, config.GEMINI_TOKENS_PER_MINUTE)
+
+    results = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(limiter,)) as pool, \
+                open(results_path, "a", encoding="utf-8") as results_file:
+            futures = [pool.submit(_generate, entry, out_dir) for entry in pending]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    results_file.write(json.dumps(result) + "\n")
+                    results_file.flush()
+                    print(f"[{len(results)}/{len(pending)}] {result['status']}: {result['topic']} "
+                          f"({result['seconds']:.1f}s)")
+            except KeyboardInterrupt:
+                print("Interrupted; finished entries are saved, run again to resume")
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        manager.shutdown()
+
+    elapsed = time.perf_counter() - start
+    done = sum(1 for result in results if result["status"] == "done")
+    print(f"Generated {done}/{len(pending)} decks in {elapsed:.1f}s "
+          f"({done / elapsed * 3600:.0f} decks/hour)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many decks from a CSV/JSONL topic manifest.")
+    parser.add_argument("manifest", help="CSV or JSONL file with topic[,template,includeCode,mode,id]")
+    parser.add_argument("--out", default="batch_output", help="directory for the generated decks")
+    parser.add_argument("--results", help="results manifest (default: <out>/results.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--skip-failed", action="store_true", help="do not retry entries that failed before")
+    args = parser.parse_args(argv)
+
+    results_path = args.results or os.path.join(args.out, "results.jsonl")
+    run(args.manifest, args.out, results_path, max(1, args.workers), retry_failed=not args.skip_failed)
+
+
+if __name__ == "__main__":
+    main()
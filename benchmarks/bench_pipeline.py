@@ -0,0 +1,252 @@
+"""End-to-end benchmark of pptgen.create_presentation against offline fakes.
+
+Gemini is replaced by benchmarks.fakes.FakeGemini and Pexels by a local
+FakePexelsServer, both with configurable latency, so runs are repeatable and
+cost nothing. Decks go to the deck storage picked by --storage; "object"
+uses the in-memory FakeObjectStore in place of S3. Reports per-stage
+latency, throughput at each concurrency level, peak RSS and deck sizes as
+JSON:
+
+    python benchmarks/bench_pipeline.py --concurrency 1 4 8 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeGemini, FakeObjectStore, FakePexelsServer  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ("text", "images", "render", "store", "total")
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """Wraps the pipeline stages of pptgen to time them per run (one run per thread)."""
+
+    def __init__(self, pptgen):
+        self.pptgen = pptgen
+        self._current = threading.local()
+        self._wrap("gettext", "text")
+        self._wrap("getphoto", None)
+        self._wrap("render_presentation", "render")
+        store = pptgen.deck_store
+        add = store.add
+
+        def timed_add(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return add(*args, **kwargs)
+            finally:
+                self._record("store", time.perf_counter() - start)
+
+        store.add = timed_add
+
+    def _wrap(self, name, stage):
+        original = getattr(self.pptgen, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            if name == "getphoto":
+                self._current.run["images_started"] = start
+            try:
+                return original(*args, **kwargs)
+            finally:
+                if stage:
+                    self._record(stage, time.perf_counter() - start)
+
+        setattr(self.pptgen, name, timed)
+
+    def _record(self, stage, seconds):
+        run = getattr(self._current, "run", None)
+        if run is not None:
+            run[stage] = run.get(stage, 0.0) + seconds
+
+    def run(self, topic, template, include_code, mode):
+        run = self._current.run = {}
+
+        def progress(event, **data):
+            # Image results arrive on download threads; they close over this run
+            if event == "image":
+                run["images_done"] = time.perf_counter()
+
+        start = time.perf_counter()
+        result = self.pptgen.create_presentation(topic, template, include_code, True, None, mode,
+                                                 progress=progress)
+        run["total"] = time.perf_counter() - start
+        if "images_started" in run:
+            run["images"] = run.pop("images_done", run["images_started"]) - run.pop("images_started")
+        run["output_bytes"] = self.pptgen.deck_store.get(result["id"])["size"]
+        run["image_bytes"] = result.get("image_bytes")
+        del self._current.run
+        return run
+
+
+def bench_sequential(timer, args):
+    runs = [timer.run(f"Sequential topic {i}", args.template, args.include_code, args.mode)
+            for i in range(args.repeat)]
+    return {
+        "runs": len(runs),
+        "stages": {stage: summarize([run[stage] for run in runs if stage in run]) for stage in STAGES},
+        "output_bytes": summarize([run["output_bytes"] for run in runs]),
+    }
+
+
+def bench_concurrent(timer, args, concurrency):
+    requests = concurrency * args.rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        runs = list(pool.map(
+            lambda i: timer.run(f"Concurrent {concurrency} topic {i}", args.template, args.include_code, args.mode),
+            range(requests),
+        ))
+    seconds = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": seconds,
+        "decks_per_second": requests / seconds,
+        "latency": summarize([run["total"] for run in runs]),
+        "output_bytes": summarize([run["output_bytes"] for run in runs]),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="sequential runs for the per-stage timings")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rounds", type=int, default=2, help="requests per concurrent worker")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--llm-per-token", type=float, default=0.0, help="extra seconds per response token")
+    parser.add_argument("--image-latency", type=float, default=0.2, help="seconds per fake image download")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="seconds per fake Pexels search")
+    parser.add_argument("--slides", type=int, default=6)
+    parser.add_argument("--template", type=int, default=1)
+    parser.add_argument("--include-code", action="store_true")
+    parser.add_argument("--mode", choices=["outline", "single_shot"], default="outline")
+    parser.add_argument("--image-cache", action="store_true", help="keep the shared image cache enabled")
+    parser.add_argument("--storage", choices=["filesystem", "memory", "object"], default="filesystem",
+                        help="deck storage backend")
+    parser.add_argument("--storage-latency", type=float, default=0.0,
+                        help="seconds per fake object store request")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = FakePexelsServer(args.search_latency, args.image_latency).start()
+    fake = FakeGemini(args.llm_latency, args.llm_per_token, args.slides)
+    workdir = tempfile.mkdtemp(prefix="pptgen-bench-")
+
+    # Settings are loaded on the first config read, so set them up front
+    os.environ.update({
+        "PEXELS_API_URL": f"{server.url}/v1",
+        "LLM_CACHE_ENABLED": "0",
+        "IMAGE_CACHE_ENABLED": "1" if args.image_cache else "0",
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "cache", "images"),
+        "WORKSPACE_ROOT": workdir,
+        "GENERATION_MODE": args.mode,
+        "DECK_STORAGE": args.storage,
+        "DECK_STORAGE_BUCKET": "bench-decks",
+    })
+    templates = os.path.join(REPO_ROOT, "template")
+    if os.path.isdir(templates):
+        os.symlink(templates, os.path.join(workdir, "template"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import gpt
+        gpt.get_summarise = fake.get_summarise
+        import pptgen
+        object_store = None
+        if args.storage == "object":
+            object_store = FakeObjectStore(args.storage_latency)
+            pptgen.deck_store.backend = pptgen.deckstore.ObjectStoreBackend("bench-decks", client=object_store)
+        pptgen.warm_up()
+        timer = StageTimer(pptgen)
+
+        # One untimed run so imports, template parsing and connection setup don't skew the numbers
+        timer.run("Warm-up topic", args.template, args.include_code, args.mode)
+        report = {
+            "meta": {
+                "timestamp": time.time(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "sequential": bench_sequential(timer, args),
+            "throughput": [bench_concurrent(timer, args, concurrency) for concurrency in args.concurrency],
+            "peak_rss_kb": peak_rss_kb(),
+            "fake_gemini": fake.stats(),
+            "fake_pexels": {"requests": server.requests, "bytes_sent": server.bytes_sent},
+            "fake_object_store": object_store.stats() if object_store is not None else None,
+        }
+    finally:
+        os.chdir(cwd)
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+        print(f"Benchmark report written to {args.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Cold-start benchmark: import time and first-request latency of pptgen.
+
+Every sample runs in a fresh interpreter in an empty working directory, the
+way a new API worker starts. It times `import pptgen`, the first
+/api/health request and the first deck generated through /api/generate
+(Gemini and Pexels are the offline fakes from benchmarks.fakes). It also
+records which heavy SDKs the import pulled in and any files it created,
+since neither should happen before the first request needs them:
+
+    python benchmarks/bench_startup.py --samples 5 --max-import-seconds 0.5
+
+Exits with status 1 when the median import time is over --max-import-seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Modules that are slow to import and should only load when first used
+HEAVY_MODULES = ("google.generativeai", "pptx", "PIL.Image", "jsonschema")
+
+
+def probe(args):
+    """Runs inside the fresh interpreter; prints one JSON sample."""
+    start = time.perf_counter()
+    import pptgen
+    import_seconds = time.perf_counter() - start
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    created = sorted(os.listdir("."))
+
+    client = pptgen.app.test_client()
+    start = time.perf_counter()
+    response = client.get("/api/health")
+    first_request_seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/api/health returned {response.status_code}")
+    start = time.perf_counter()
+    client.get("/api/health")
+    second_request_seconds = time.perf_counter() - start
+
+    first_generation_seconds = None
+    if args.generate:
+        from benchmarks.fakes import FakeGemini
+        import gpt
+        gpt.get_summarise = FakeGemini(args.llm_latency, slides=args.slides).get_summarise
+        start = time.perf_counter()
+        job = client.post("/api/generate", json={"topic": "Cold start", "template": args.template}).get_json()
+        while True:
+            status = client.get(job["status_url"]).get_json()
+            if status["status"] not in ("queued", "running"):
+                break
+            time.sleep(0.01)
+        first_generation_seconds = time.perf_counter() - start
+        if status["status"] != "done":
+            raise RuntimeError(f"first generation failed: {status.get('error')}")
+
+    print(json.dumps({
+        "import_seconds": import_seconds,
+        "first_request_seconds": first_request_seconds,
+        "second_request_seconds": second_request_seconds,
+        "first_generation_seconds": first_generation_seconds,
+        "heavy_modules_at_import": loaded,
+        "files_created_at_import": created,
+    }))
+
+
+def import_profile(env, workdir, top):
+    """Slowest modules (cumulative microseconds) from `python -X importtime -c "import pptgen"`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import pptgen"], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        modules.append((int(parts[1]), parts[2].strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_us": cumulative} for cumulative, name in modules[:top]]
+
+
+def run_sample(args, env):
+    workdir = tempfile.mkdtemp(prefix="pptgen-startup-")
+    templates = os.path.join(REPO_ROOT, "template")
+    try:
+        if os.path.isdir(templates):
+            os.symlink(templates, os.path.join(workdir, "template"))
+        command = [sys.executable, os.path.abspath(__file__), "--probe", "--slides", str(args.slides),
+                   "--llm-latency", str(args.llm_latency), "--template", str(args.template)]
+        if not args.generate:
+            command.append("--no-generate")
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        process_seconds = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"startup probe failed:\n{result.stderr}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        # The template symlink is the benchmark's own
+        sample["files_created_at_import"] = [name for name in sample["files_created_at_import"]
+                                             if name != "template"]
+        sample["process_seconds"] = process_seconds
+        return sample
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--no-generate", dest="generate", action="store_false",
+                        help="skip timing the first deck generation")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake Gemini call")
+    parser.add_argument("--slides", type=int, default=6)
+    parser.add_argument("--template", type=int, default=1)
+    parser.add_argument("--import-profile", type=int, default=15, metavar="N",
+                        help="report the N slowest imports (0 to skip)")
+    parser.add_argument("--max-import-seconds", type=float, help="fail if the median import takes longer")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.probe:
+        sys.path.insert(0, os.getcwd())
+        probe(args)
+        return None
+
+    # Imported here, not at the top: the probe must start with nothing loaded
+    from benchmarks.bench_pipeline import git_commit, summarize
+    from benchmarks.fakes import FakePexelsServer
+
+    server = FakePexelsServer(0, 0).start()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])),
+               PEXELS_API_URL=f"{server.url}/v1", LLM_CACHE_ENABLED="0", IMAGE_CACHE_ENABLED="0",
+               PYTHONDONTWRITEBYTECODE="1")
+    try:
+        samples = [run_sample(args, env) for _ in range(args.samples)]
+        profile_dir = tempfile.mkdtemp(prefix="pptgen-startup-")
+        try:
+            slowest = import_profile(env, profile_dir, args.import_profile) if args.import_profile else None
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+    finally:
+        server.stop()
+
+    def series(field):
+        return summarize([sample[field] for sample in samples if sample[field] is not None])
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items() if key != "probe"},
+        },
+        "import_seconds": series("import_seconds"),
+        "process_seconds": series("process_seconds"),
+        "first_request_seconds": series("first_request_seconds"),
+        "second_request_seconds": series("second_request_seconds"),
+        "first_generation_seconds": series("first_generation_seconds"),
+        "heavy_modules_at_import": sorted({name for sample in samples for name in sample["heavy_modules_at_import"]}),
+        "files_created_at_import": sorted({name for sample in samples for name in sample["files_created_at_import"]}),
+        "slowest_imports": slowest,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+        print(f"Benchmark report written to {args.output}")
+    else:
+        print(text)
+
+    median_import = statistics.median(sample["import_seconds"] for sample in samples)
+    if args.max_import_seconds is not None and median_import > args.max_import_seconds:
+        print(f"Median import took {median_import:.3f}s, over the {args.max_import_seconds:.3f}s budget",
+              file=sys.stderr)
+        sys.exit(1)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Deterministic offline stand-ins for Gemini, Pexels and S3 used by the benchmarks."""
+import datetime
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+# Pexels rendition name -> (max width, max height); 0 means unbounded
+RENDITIONS = {
+    "original": (0, 0),
+    "large2x": (1880, 1300),
+    "large": (940, 650),
+    "medium": (0, 350),
+    "small": (0, 130),
+    "portrait": (800, 1200),
+    "landscape": (1200, 627),
+    "tiny": (280, 200),
+}
+PHOTO_SIZE = (4000, 3000)
+
+
+def _fit(size, box):
+    width, height = size
+    max_width, max_height = box
+    scale = min(max_width / width if max_width else 1, max_height / height if max_height else 1, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class FakeGemini:
+    """Replacement for gpt.get_summarise that answers every prompt type locally.
+
+    Each call sleeps `latency` seconds plus `per_token` seconds per response
+    token, streaming the text in chunks when on_token is given, and counts
+    calls and estimated tokens the way gpt reports them in
+    pptgen_llm_calls_total and pptgen_llm_tokens_total.
+    """
+
+    def __init__(self, latency=0.5, per_token=0.0, slides=6):
+        self.latency = latency
+        self.per_token = per_token
+        self.slides = slides
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self._lock = threading.Lock()
+
+    def outline(self, topic):
+        parts = [f"Title: {topic}"]
+        for number in range(1, self.slides + 1):
+            parts.append(
+                f"Slide {number}: {topic} part {number}\n"
+                f"- Key idea {number}.1 about {topic} and why it matters in practice\n"
+                f"- Key idea {number}.2 expanding on how {topic} works under load\n"
+                f"- Key idea {number}.3 covering trade-offs and common pitfalls\n"
+                f"\nImage Suggestion: A diagram of {topic} concept {number}\n---"
+            )
+        return "\n".join(parts)
+
+    def deck_json(self, topic, include_code):
+        slides = [{
+            "title": f"{topic} part {number}",
+            "bullets": [f"Key idea {number}.{point} about {topic}" for point in range(1, 4)],
+            "image_query": f"A diagram of {topic} concept {number}",
+        } for number in range(1, self.slides + 1)]
+        if include_code:
+            slides.append({"title": "Code Example", "bullets": [], "language": "python",
+                           "code": "values = [n * n for n in range(10)]\nprint(sum(values))"})
+        return json.dumps({"title": topic, "slides": slides})
+
+    def answer(self, system, topic):
+        if "<<<REQUEST" in system:
+            requests = re.split(r"<<<REQUEST \d+>>>", system)[1:]
+            topics = topic.split("\n")
+            return "".join(f"<<<ANSWER {number}>>>\n{self.answer(request, request_topic)}\n"
+                           for number, (request, request_topic) in enumerate(zip(requests, topics), 1))
+        if "single JSON object" in system:
+            return self.deck_json(topic, "Code Slide" in system)
+        if "Create a detailed presentation outline" in system:
+            return self.outline(topic)
+        if "Generate comprehensive" in system:
+            sentences = "\n".join(f"[Summary Sentence {number}: Fact {number} about {topic}.]"
+                                  for number in range(1, 11))
+            return f"<<<TOPIC>>>\n{topic}\n<<<TOPIC>>>\n<<<SUMMARY_START>>>\n{sentences}\n<<<SUMMARY_END>>>"
+        return "```python\nvalues = [n * n for n in range(10)]\nprint(sum(values))\n```"
+
+    def get_summarise(self, system, text, use_cache=True, on_token=None, validate=None):
+        response = self.answer(system, text)
+        tokens = max(1, len(response) // 4)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += max(1, (len(system) + len(text)) // 4)
+            self.response_tokens += tokens
+        delay = self.latency + self.per_token * tokens
+        if on_token is None:
+            time.sleep(delay)
+            return response
+        # Spread the delay over the streamed chunks
+        chunks = [response[start:start + 200] for start in range(0, len(response), 200)]
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            on_token(chunk)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                    "response_tokens": self.response_tokens}
+
+
+class FakePexelsServer:
+    """Local HTTP server speaking enough of the Pexels API for addphoto.
+
+    /v1/search returns one deterministic photo per query position, and every
+    rendition URL points back at this server, which serves a noisy JPEG of
+    the rendition's size after `image_latency` seconds.
+    """
+
+    def __init__(self, search_latency=0.05, image_latency=0.2):
+        self.search_latency = search_latency
+        self.image_latency = image_latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._images = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-pexels", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def image(self, rendition):
+        with self._lock:
+            data = self._images.get(rendition)
+            if data is None:
+                size = _fit(PHOTO_SIZE, RENDITIONS.get(rendition, (0, 0)))
+                image = Image.effect_noise(size, 48).convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, "JPEG", quality=90)
+                data = self._images[rendition] = buffer.getvalue()
+            return data
+
+    def search(self, query, per_page):
+        photos = []
+        for position in range(per_page):
+            photo_id = int(hashlib.sha1(f"{query}/{position}".encode()).hexdigest()[:8], 16)
+            base = f"{self.url}/photos/{photo_id}"
+            photos.append({
+                "id": photo_id,
+                "width": PHOTO_SIZE[0],
+                "height": PHOTO_SIZE[1],
+                "src": {name: f"{base}/{name}.jpeg" for name in RENDITIONS},
+            })
+        return {"page": 1, "per_page": per_page, "photos": photos}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, content_type, body):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+                with fake._lock:
+                    fake.requests += 1
+                    fake.bytes_sent += len(body)
+
+            def do_HEAD(self):
+                self._send("text/plain", b"")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.endswith("/search"):
+                    query = parse_qs(url.query)
+                    time.sleep(fake.search_latency)
+                    body = fake.search(query.get("query", [""])[0], int(query.get("per_page", ["1"])[0]))
+                    self._send("application/json", json.dumps(body).encode())
+                elif url.path.startswith("/photos/"):
+                    time.sleep(fake.image_latency)
+                    rendition = url.path.rsplit("/", 1)[-1].split(".")[0]
+                    self._send("image/jpeg", fake.image(rendition))
+                else:
+                    self._send("text/plain", b"ok")
+
+        return Handler
+
+
+class MissingObject(Exception):
+    """Raised like botocore's ClientError for a missing key."""
+
+    def __init__(self, key):
+        super().__init__(f"NoSuchKey: {key}")
+        self.response = {"Error": {"Code": "NoSuchKey", "Message": key}}
+
+
+class FakeObjectStore:
+    """In-memory stand-in for a boto3 S3 client, for deckstore.ObjectStoreBackend.
+
+    Implements put_object, get_object, head_object and delete_object with
+    the same arguments and response shapes, waiting `latency` seconds per
+    request, and counts requests and bytes in each direction.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def _request(self, bytes_in=0, bytes_out=0):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def _lookup(self, Bucket, Key):
+        with self._lock:
+            stored = self._objects.get((Bucket, Key))
+        if stored is None:
+            raise MissingObject(Key)
+        return stored
+
+    def put_object(self, Bucket, Key, Body, ContentType="binary/octet-stream", Metadata=None):
+        body = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self._request(bytes_in=len(body))
+        with self._lock:
+            self._objects[(Bucket, Key)] = {
+                "Body": body,
+                "ContentType": ContentType,
+                "Metadata": dict(Metadata or {}),
+                "LastModified": datetime.datetime.now(datetime.timezone.utc),
+            }
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def head_object(self, Bucket, Key):
+        self._request()
+        stored = self._lookup(Bucket, Key)
+        return {"ContentLength": len(stored["Body"]), "ContentType": stored["ContentType"],
+                "Metadata": stored["Metadata"], "LastModified": stored["LastModified"]}
+
+    def get_object(self, Bucket, Key):
+        stored = self._lookup(Bucket, Key)
+        self._request(bytes_out=len(stored["Body"]))
+        return {"Body": io.BytesIO(stored["Body"]), "ContentLength": len(stored["Body"]),
+                "ContentType": stored["ContentType"], "Metadata": stored["Metadata"],
+                "LastModified": stored["LastModified"]}
+
+    def delete_object(self, Bucket, Key):
+        self._request()
+        with self._lock:
+            self._objects.pop((Bucket, Key), None)
+        return {}
+
+    def stats(self):
+        with self._lock:
+            return {"objects": len(self._objects), "requests": self.requests,
+                    "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
@@ -0,0 +1,159 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+
+def _bool(name, default):
+    value = os.getenv(name)
+    return value.strip().lower() in ("1", "true", "yes", "on") if value not in (None, "") else default
+
+
+def _float(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+class Settings:
+    """Every runtime setting, read once from project.env and the environment.
+
+    All runtime settings live here so the Flask app, the workers and any
+    scripts read the same values. Override them in project.env or the
+    environment. Modules read them as config.NAME; nothing is loaded until
+    the first such read, so importing config has no side effects.
+    """
+
+    def __init__(self):
+        load_dotenv("project.env")
+
+        # Gemini API key (API_KEY in project.env)
+        self.GEMINI_API_KEY = os.getenv("API_KEY")
+
+        # Background generation workers
+        self.GENERATION_WORKERS = _int("GENERATION_WORKERS", 2)
+        # Jobs queued or running at once before new requests get 429 (0 = no limit;
+        # per worker process, see SERVER_WORKERS)
+        self.MAX_ACTIVE_GENERATIONS = _int("MAX_ACTIVE_GENERATIONS", 8)
+        # How long finished jobs stay queryable through /api/jobs/<id>
+        self.JOB_RETENTION_SECONDS = _int("JOB_RETENTION_SECONDS", 3600)
+        # Identical concurrent requests share one job; its result is reused for this long
+        self.COALESCE_REQUESTS = _bool("COALESCE_REQUESTS", True)
+        self.RESULT_CACHE_SECONDS = _int("RESULT_CACHE_SECONDS", 300)
+
+        # Gemini quota shared by all workers in a process
+        self.GEMINI_REQUESTS_PER_MINUTE = _int("GEMINI_REQUESTS_PER_MINUTE", 15)
+        self.GEMINI_TOKENS_PER_MINUTE = _int("GEMINI_TOKENS_PER_MINUTE", 1000000)
+        self.GEMINI_MAX_RETRIES = _int("GEMINI_MAX_RETRIES", 4)
+        self.GEMINI_BACKOFF_SECONDS = _int("GEMINI_BACKOFF_SECONDS", 2)
+
+        # Run summary, code and outline calls for all topics concurrently
+        self.LLM_CONCURRENT = _bool("LLM_CONCURRENT", True)
+        self.LLM_FANOUT_WORKERS = _int("LLM_FANOUT_WORKERS", 4)
+
+        # Combine several topics into one summary, one code and one outline call
+        self.LLM_BATCH_TOPICS = _bool("LLM_BATCH_TOPICS", False)
+        self.LLM_BATCH_SIZE = _int("LLM_BATCH_SIZE", 4)
+
+        # "outline" (summary, code, then outline calls) or "single_shot" (one JSON call per topic)
+        self.GENERATION_MODE = os.getenv("GENERATION_MODE", "outline")
+
+        # Gemini model used for every generation call
+        self.GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+        # On-disk cache of Gemini responses, keyed on (model, prompt, topic)
+        self.LLM_CACHE_ENABLED = _bool("LLM_CACHE_ENABLED", True)
+        self.LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3")
+        self.LLM_CACHE_TTL_SECONDS = _int("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+        self.LLM_CACHE_MAX_BYTES = _int("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+        # Pexels image search
+        self.PEXELS_API_URL = os.getenv("PEXELS_API_URL", "https://api.pexels.com/v1")
+        self.PEXELS_API_KEY = os.getenv("PEXELS_API_KEY", "5JV9cVZRTr6VUv9pqbYDWvxlluf7DvAtm1B8xL7VJvVia9ULckKbnYfc")
+
+        # Shared HTTP connection pool used for image search and downloads
+        self.HTTP_POOL_CONNECTIONS = _int("HTTP_POOL_CONNECTIONS", 4)
+        self.HTTP_POOL_MAXSIZE = _int("HTTP_POOL_MAXSIZE", 16)
+        self.HTTP_CONNECT_TIMEOUT = _int("HTTP_CONNECT_TIMEOUT", 5)
+        self.HTTP_READ_TIMEOUT = _int("HTTP_READ_TIMEOUT", 30)
+
+        # Concurrent image search and download
+        self.IMAGE_FETCH_WORKERS = _int("IMAGE_FETCH_WORKERS", 8)
+        self.IMAGE_PER_HOST_LIMIT = _int("IMAGE_PER_HOST_LIMIT", 4)
+        self.IMAGE_CHUNK_SIZE = _int("IMAGE_CHUNK_SIZE", 64 * 1024)
+
+        # Images are fetched and re-encoded just large enough for the slide box at this DPI
+        self.IMAGE_DPI = _int("IMAGE_DPI", 150)
+        self.IMAGE_JPEG_QUALITY = _int("IMAGE_JPEG_QUALITY", 85)
+
+        # Downloaded images are kept and shared between decks
+        self.IMAGE_CACHE_ENABLED = _bool("IMAGE_CACHE_ENABLED", True)
+        self.IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+        self.IMAGE_CACHE_MAX_BYTES = _int("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+        # Parent directory for per-job temporary workspaces (None = system temp dir)
+        self.WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT") or None
+
+        # Longest a deck waits for outstanding images after its text slides are rendered
+        self.IMAGE_WAIT_SECONDS = _int("IMAGE_WAIT_SECONDS", 30)
+
+        # Generated decks are deleted once older than the max age or over the size budget
+        self.DECK_MAX_AGE_SECONDS = _int("DECK_MAX_AGE_SECONDS", 7 * 24 * 3600)
+        self.DECK_MAX_BYTES = _int("DECK_MAX_BYTES", 1024 * 1024 * 1024)
+        self.DECK_GC_INTERVAL_SECONDS = _int("DECK_GC_INTERVAL_SECONDS", 600)
+        # Size budget instead of DECK_MAX_BYTES when decks are kept in memory
+        self.DECK_MEMORY_MAX_BYTES = _int("DECK_MEMORY_MAX_BYTES", 256 * 1024 * 1024)
+        # Browsers may keep a downloaded deck this long; IDs are never reused
+        self.DECK_CACHE_MAX_AGE = _int("DECK_CACHE_MAX_AGE", 365 * 24 * 3600)
+        # Where decks are stored: "filesystem" (static/presentations), "memory" (this
+        # process only, nothing on disk) or "object" (an S3-compatible bucket; needs boto3)
+        self.DECK_STORAGE = os.getenv("DECK_STORAGE", "filesystem")
+        self.DECK_STORAGE_BUCKET = os.getenv("DECK_STORAGE_BUCKET")
+        self.DECK_STORAGE_PREFIX = os.getenv("DECK_STORAGE_PREFIX", "decks/")
+        # S3 endpoint for the object storage, e.g. a local MinIO (None = AWS)
+        self.DECK_STORAGE_ENDPOINT = os.getenv("DECK_STORAGE_ENDPOINT") or None
+        # SQLite index of stored decks (None = next to filesystem decks, else in memory)
+        self.DECK_INDEX_PATH = os.getenv("DECK_INDEX_PATH") or None
+
+        # Production server (gunicorn -c gunicorn.conf.py wsgi:app)
+        self.SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:5000")
+        # Jobs live in the memory of the worker process that accepted them, so
+        # MAX_ACTIVE_GENERATIONS and the jobs /api/jobs/<id> can see are per worker.
+        # Keep one worker unless requests are routed stickily.
+        self.SERVER_WORKERS = _int("SERVER_WORKERS", 1)
+        self.SERVER_THREADS = _int("SERVER_THREADS", 16)
+        # How long a stopping worker keeps serving while its in-flight generations finish
+        self.SERVER_GRACEFUL_TIMEOUT = _int("SERVER_GRACEFUL_TIMEOUT", 120)
+
+        # Opt-in sampling profiler: ?profile=1 or X-Profile: 1 on /api/generate while
+        # enabled, plus this fraction of all generations picked at random
+        self.PROFILING_ENABLED = _bool("PROFILING_ENABLED", False)
+        self.PROFILE_SAMPLE_RATE = _float("PROFILE_SAMPLE_RATE", 0.0)
+        self.PROFILE_INTERVAL_MS = _int("PROFILE_INTERVAL_MS", 5)
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """The process-wide Settings, loaded on first use."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
+
+
+def __getattr__(name):
+    # config.NAME reads the shared settings
+    if name.startswith("__"):
+        raise AttributeError(name)
+    try:
+        return getattr(get_settings(), name)
+    except AttributeError:
+        raise AttributeError(f"module 'config' has no attribute {name!r}") from None
@@ -0,0 +1,102 @@
+import io
+import os
+import threading
+import time
+import metrics
+
+
+class TemplatePrototype:
+    """A template parsed once and saved back without any slides."""
+
+    __slots__ = ("path", "data", "title_layout", "blank_layout", "load_seconds")
+
+    def __init__(self, path, data, title_layout, blank_layout, load_seconds):
+        self.path = path
+        self.data = data
+        self.title_layout = title_layout
+        self.blank_layout = blank_layout
+        self.load_seconds = load_seconds
+
+
+def _find_layout(prs, name, default):
+    for index, layout in enumerate(prs.slide_layouts):
+        if layout.name.strip().lower() == name:
+            return index
+    return min(default, len(prs.slide_layouts) - 1)
+
+
+def _strip_slides(prs):
+    """Remove every slide, including its relationship, so the slide parts are not saved."""
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids):
+        prs.part.drop_rel(slide_id.rId)
+        slide_ids.remove(slide_id)
+
+
+def build_prototype(path):
+    from pptx import Presentation  # deferred so importing the app stays fast
+    start = time.perf_counter()
+    if path and os.path.exists(path):
+        prs = Presentation(path)
+        _strip_slides(prs)
+    else:
+        prs = Presentation()
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    load_seconds = time.perf_counter() - start
+    metrics.observe("template_load", load_seconds)
+    return TemplatePrototype(
+        path,
+        buffer.getvalue(),
+        _find_layout(prs, "title slide", 0),
+        _find_layout(prs, "blank", 6),
+        load_seconds,
+    )
+
+
+class TemplateRegistry:
+    """Slide-free template prototypes kept in memory, one per template choice.
+
+    Each job gets its own Presentation opened from the prototype's bytes,
+    so templates are parsed and cleaned once per process instead of once
+    per request. Unknown choices or missing files use python-pptx's default
+    template.
+    """
+
+    def __init__(self, templates):
+        self.templates = dict(templates)
+        self._prototypes = {}
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        for choice in list(self.templates) + [None]:
+            self.get(choice)
+
+    def get(self, choice):
+        path = self.templates.get(choice)
+        if path and not os.path.exists(path):
+            path = None
+        prototype = self._prototypes.get(path)
+        if prototype is None:
+            with self._lock:
+                prototype = self._prototypes.get(path)
+                if prototype is None:
+                    prototype = build_prototype(path)
+                    self._prototypes[path] = prototype
+                    print(f"Loaded template {path or 'default'} in {prototype.load_seconds * 1000:.1f} ms")
+        return prototype
+
+    def new_presentation(self, choice):
+        """Fresh, slide-free Presentation for a template choice, plus its prototype."""
+        prototype = self.get(choice)
+        from pptx import Presentation
+        return Presentation(io.BytesIO(prototype.data)), prototype
+
+    def stats(self):
+        return {
+            prototype.path or "default": {
+                "bytes": len(prototype.data),
+                "load_seconds": prototype.load_seconds,
+            }
+            for prototype in list(self._prototypes.values())
+        }
@@ -0,0 +1,422 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# New IDs are presentation_<uuid hex>; older decks used a short number
+DECK_ID = re.compile(r"presentation_[0-9a-f]{1,32}")
+
+# Extra files kept next to a deck under its ID and removed along with it
+ARTIFACTS = ("speedscope.json",)
+
+PPTX_MIMETYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+# Error codes S3-compatible clients use for a missing object
+MISSING_OBJECT_CODES = ("NoSuchKey", "NotFound", "404")
+
+
+def new_deck_id():
+    """Random, collision-free presentation ID."""
+    return f"presentation_{uuid.uuid4().hex}"
+
+
+def valid_deck_id(deck_id):
+    return bool(DECK_ID.fullmatch(deck_id))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _content_type(key):
+    return PPTX_MIMETYPE if key.endswith(".pptx") else mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class FilesystemBackend:
+    """Decks as files in a local directory, with the index next to them."""
+
+    def __init__(self, directory):
+        # Absolute, since Flask's send_file resolves relative paths against the app root
+        self.directory = os.path.abspath(directory)
+        self.index_path = os.path.join(self.directory, "index.sqlite3")
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def put(self, key, data, sha256=None):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        partial_path = path + ".part"
+        with open(partial_path, "wb") as file:
+            file.write(data)
+        os.replace(partial_path, path)
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def stat(self, key):
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return {"size": stat.st_size, "created_at": stat.st_mtime, "sha256": None}
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def scan(self):
+        """(key, size, mtime) of every deck file in the directory."""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".pptx"):
+                stat = entry.stat()
+                yield entry.name, stat.st_size, stat.st_mtime
+
+
+class MemoryBackend:
+    """Decks kept in this process's memory; nothing is written to disk.
+
+    Suits stateless workers on a read-only filesystem. Decks are lost when
+    the process exits and are only visible to the worker that made them.
+    """
+
+    index_path = None
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return None
+
+    def put(self, key, data, sha256=None):
+        with self._lock:
+            self._objects[key] = (bytes(data), time.time(), sha256)
+
+    def get(self, key):
+        with self._lock:
+            stored = self._objects.get(key)
+        return stored[0] if stored is not None else None
+
+    def stat(self, key):
+        with self._lock:
+            stored = self._objects.get(key)
+        if stored is None:
+            return None
+        data, created_at, sha256 = stored
+        return {"size": len(data), "created_at": created_at, "sha256": sha256}
+
+    def delete(self, key):
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def scan(self):
+        return []
+
+
+class ObjectStoreBackend:
+    """Decks as objects in an S3-compatible bucket.
+
+    `client` is anything with boto3's put_object/get_object/head_object/
+    delete_object methods; by default a boto3 S3 client for `endpoint_url`
+    is created on first use. Decks stored by other workers are found through
+    the bucket, so any worker can serve any deck. The bucket is not scanned
+    on startup; use a lifecycle rule to expire decks this process never saw.
+    """
+
+    index_path = None
+
+    def __init__(self, bucket, prefix="", client=None, endpoint_url=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3  # optional: only needed for this backend
+                    self._client = boto3.client("s3", endpoint_url=self.endpoint_url)
+        return self._client
+
+    def _key(self, key):
+        return self.prefix + key
+
+    @staticmethod
+    def _missing(error):
+        code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+        return str(code) in MISSING_OBJECT_CODES
+
+    def path(self, key):
+        return None
+
+    def put(self, key, data, sha256=None):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data,
+                               ContentType=_content_type(key), Metadata={"sha256": sha256} if sha256 else {})
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def stat(self, key):
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+        return {
+            "size": response["ContentLength"],
+            "created_at": response["LastModified"].timestamp(),
+            "sha256": (response.get("Metadata") or {}).get("sha256"),
+        }
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def scan(self):
+        return []
+
+
+def make_backend(kind, directory=None, bucket=None, prefix="", endpoint_url=None):
+    """Storage backend by name: "filesystem", "memory" or "object"."""
+    if kind == "filesystem":
+        return FilesystemBackend(directory)
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "object":
+        if not bucket:
+            raise ValueError("the object deck storage needs a bucket")
+        return ObjectStoreBackend(bucket, prefix, endpoint_url=endpoint_url)
+    raise ValueError(f"unknown deck storage {kind!r}")
+
+
+class DeckStore:
+    """Generated decks in a storage backend plus a SQLite index of their metadata.
+
+    Lookups go through the index by ID, so serving a deck never lists the
+    backend; decks the index does not know yet (stored by another worker)
+    are looked up in the backend once and then indexed. A background
+    collector removes decks older than max_age seconds and then the oldest
+    decks until the total is under max_bytes; add() also collects at once
+    when a new deck takes the total over max_bytes, so the budget holds
+    between collector runs. Files already in a filesystem
+    backend but not in the index (e.g. decks from before the index existed)
+    are adopted when the index is opened so they age out too. Nothing
+    touches the disk until the store is first used.
+
+    The index lives at index_path, by default the backend's own (next to
+    the decks on a filesystem) or in memory.
+    """
+
+    def __init__(self, backend, index_path=None, max_age=7 * 24 * 3600, max_bytes=1024 * 1024 * 1024,
+                 interval=600):
+        self.backend = backend
+        self.index_path = index_path or backend.index_path or ":memory:"
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._connection = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _db(self):
+        """The index connection, opened (and its directory created) on first use."""
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        if self.index_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False)
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS decks ("
+                " id TEXT PRIMARY KEY,"
+                " filename TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " metadata TEXT NOT NULL,"
+                " sha256 TEXT)"
+            )
+            columns = {row[1] for row in db.execute("PRAGMA table_info(decks)")}
+            if "sha256" not in columns:
+                db.execute("ALTER TABLE decks ADD COLUMN sha256 TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS decks_age ON decks (created_at)")
+        self._adopt_untracked(db)
+        return db
+
+    def add(self, deck_id, data, **metadata):
+        """Store a finished deck's bytes and index them; returns its local path, if it has one."""
+        filename = f"{deck_id}.pptx"
+        sha256 = hashlib.sha256(data).hexdigest()
+        db = self._db
+        self.backend.put(filename, data, sha256)
+        with self._lock, db:
+            db.execute(
+                "INSERT OR REPLACE INTO decks (id, filename, size, created_at, metadata, sha256)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (deck_id, filename, len(data), time.time(), json.dumps(metadata), sha256),
+            )
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM decks").fetchone()[0]
+        self.start_collector()
+        if self.max_bytes and total > self.max_bytes:
+            self.collect(keep=deck_id)
+        return self.backend.path(filename)
+
+    def read(self, deck_id):
+        """A stored deck's bytes, or None."""
+        return self.backend.get(f"{deck_id}.pptx")
+
+    def put_artifact(self, deck_id, name, data):
+        """Store the `name` artifact (one of ARTIFACTS) of a deck."""
+        self.backend.put(f"{deck_id}.{name}", data)
+
+    def get_artifact(self, deck_id, name):
+        return self.backend.get(f"{deck_id}.{name}")
+
+    def get(self, deck_id):
+        """Index entry for a deck, or None if it is unknown or its file is gone.
+
+        "path" is the deck's local file for a filesystem backend, else None
+        and the bytes come from read().
+        """
+        db = self._db
+        with self._lock:
+            row = db.execute(
+                "SELECT filename, size, created_at, metadata, sha256 FROM decks WHERE id = ?", (deck_id,)
+            ).fetchone()
+        filename = row[0] if row is not None else f"{deck_id}.pptx"
+        stored = self.backend.stat(filename)
+        if stored is None:
+            return None
+        if row is None:
+            # Stored by another worker sharing the backend; index it from now on
+            row = (filename, stored["size"], stored["created_at"], "{}", stored["sha256"])
+            with self._lock, db:
+                db.execute(
+                    "INSERT OR IGNORE INTO decks (id, filename, size, created_at, metadata, sha256)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", (deck_id, *row),
+                )
+        filename, size, created_at, metadata, sha256 = row
+        path = self.backend.path(filename)
+        if sha256 is None:
+            # Adopted decks are hashed on first use
+            sha256 = file_sha256(path) if path else hashlib.sha256(self.backend.get(filename) or b"").hexdigest()
+            with self._lock, db:
+                db.execute("UPDATE decks SET sha256 = ? WHERE id = ?", (sha256, deck_id))
+        return {
+            "id": deck_id,
+            "filename": filename,
+            "path": path,
+            "size": size,
+            "created_at": created_at,
+            "metadata": json.loads(metadata),
+            "sha256": sha256,
+        }
+
+    def _adopt_untracked(self, db):
+        known = {row[0] for row in db.execute("SELECT filename FROM decks")}
+        adopted = [(filename[:-len(".pptx")], filename, size, mtime, "{}")
+                   for filename, size, mtime in self.backend.scan() if filename not in known]
+        # Called from _open(), before any other thread can see db; not under _lock
+        if adopted:
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO decks (id, filename, size, created_at, metadata) VALUES (?, ?, ?, ?, ?)",
+                    adopted,
+                )
+
+    def collect(self, keep=None):
+        """Delete expired decks, then the oldest ones until under max_bytes.
+
+        The deck with ID `keep` (one just added) is never removed for size.
+        Returns (decks removed, bytes freed).
+        """
+        removed = []
+        db = self._db
+        with self._lock, db:
+            if self.max_age:
+                removed += db.execute(
+                    "SELECT id, filename, size FROM decks WHERE created_at < ?", (time.time() - self.max_age,)
+                ).fetchall()
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM decks").fetchone()[0]
+            total -= sum(size for _, _, size in removed)
+            if self.max_bytes and total > self.max_bytes:
+                expired = {deck_id for deck_id, _, _ in removed}
+                for deck_id, filename, size in db.execute(
+                    "SELECT id, filename, size FROM decks ORDER BY created_at"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    if deck_id not in expired and deck_id != keep:
+                        removed.append((deck_id, filename, size))
+                        total -= size
+            db.executemany("DELETE FROM decks WHERE id = ?", [(deck_id,) for deck_id, _, _ in removed])
+
+        for deck_id, filename, _ in removed:
+            for key in [filename] + [f"{deck_id}.{name}" for name in ARTIFACTS]:
+                self.backend.delete(key)
+        freed = sum(size for _, _, size in removed)
+        if removed:
+            print(f"Deck GC removed {len(removed)} deck(s), freed {freed} bytes")
+        return len(removed), freed
+
+    def start_collector(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect_loop, name="deck-gc", daemon=True)
+                self._thread.start()
+
+    def stop_collector(self):
+        self._stop.set()
+
+    def _collect_loop(self):
+        while True:
+            try:
+                self.collect()
+            except Exception as e:
+                print(f"Deck GC failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+    def stats(self):
+        db = self._db
+        with self._lock:
+            decks, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM decks"
+            ).fetchone()
+        return {"decks": decks, "bytes": size}
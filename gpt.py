@@ -1,15 +1,140 @@
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-load_dotenv("project.env")
-# Set up the Gemini API key
-genai.configure(api_key=os.getenv('API_KEY'))
-
-def get_summarise(system, text):
-    model = genai.GenerativeModel("gemini-2.0-flash")
+import random
+import threading
+import config
+import llmcache
+import metrics
+import ratelimit
+
+# The Gemini SDK is slow to import, so it is loaded and configured by
+# get_model() on first use rather than when this module is imported.
+
+# Shared by every caller in the process so concurrent jobs stay within quota.
+# Created by get_limiter() once settings are loaded; may be replaced (see batch.py).
+limiter = None
+_limiter_lock = threading.Lock()
+_model = None
+_model_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_model():
+    """Process-wide Gemini model; its client and connections are reused across calls."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=config.GEMINI_API_KEY)
+                _model = genai.GenerativeModel(config.GEMINI_MODEL)
+    return _model
+
+
+def get_limiter():
+    """Process-wide Gemini rate limiter, created from the settings on first use."""
+    global limiter
+    if limiter is None:
+        with _limiter_lock:
+            if limiter is None:
+                limiter = ratelimit.RateLimiter(config.GEMINI_REQUESTS_PER_MINUTE, config.GEMINI_TOKENS_PER_MINUTE)
+    return limiter
+
+
+def warm_up():
+    """Create the model and open the cache ahead of the first request."""
+    get_model()
+    get_cache()
+
+
+def get_cache():
+    """Process-wide response cache, opened on first use (None when disabled)."""
+    global _cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = llmcache.ResponseCache(
+                config.LLM_CACHE_PATH,
+                ttl=config.LLM_CACHE_TTL_SECONDS,
+                max_bytes=config.LLM_CACHE_MAX_BYTES,
+            )
+        return _cache
+
+
+def _record_usage(prompt_tokens, response_tokens):
+    # Only calls that actually reached the API; cache hits cost nothing
+    metrics.LLM_CALLS.inc()
+    metrics.LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+    metrics.LLM_TOKENS.inc(response_tokens, kind="response")
+
+
+def _is_rate_limited(error):
+    from google.api_core import exceptions as google_exceptions
+    return isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)) \
+        or getattr(error, "code", None) == 429
+
+
+def _generate(model, contents, on_token, streamed):
+    if on_token is None:
+        return model.generate_content(contents).text
+    parts = []
+    for chunk in model.generate_content(contents, stream=True):
+        parts.append(chunk.text)
+        streamed.append(True)
+        on_token(chunk.text)
+    return "".join(parts)
+
+
+def get_summarise(system, text, use_cache=True, on_token=None, validate=None):
+    """Run one Gemini prompt and return the response text.
+
+    With on_token, the response is streamed and on_token is called with
+    each chunk of text as it arrives (or once with a cached response).
+    With validate, only responses for which validate(text) is true are
+    cached, and a cached response that fails it is asked for again.
+    """
+    prompt = f"{system} Topic: {text}"
+    cache = get_cache() if use_cache else None
+    key = llmcache.cache_key(config.GEMINI_MODEL, prompt, text)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None and validate is not None and not validate(cached):
+            cached = None
+        metrics.CACHE_LOOKUPS.inc(cache="llm", result="miss" if cached is None else "hit")
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+    model = get_model()
     contents = [
-        {"role": "user", "parts": [f"{system} Topic: {text}"]},
+        {"role": "user", "parts": [prompt]},
     ]
-    response = model.generate_content(contents)
-    return response.text
-
+    prompt_tokens = ratelimit.estimate_tokens(prompt)
+    limiter = get_limiter()
+    streamed = []
+    for attempt in range(config.GEMINI_MAX_RETRIES + 1):
+        limiter.acquire(prompt_tokens)
+        try:
+            response_text = _generate(model, contents, on_token, streamed)
+        except Exception as e:
+            # A stream that already delivered text cannot be retried transparently
+            if not _is_rate_limited(e) or streamed or attempt == config.GEMINI_MAX_RETRIES:
+                raise
+            # Back off exponentially (with jitter) and make every other caller wait too
+            delay = config.GEMINI_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(1, 1.5)
+            print(f"Gemini rate limit hit, retrying in {delay:.1f}s")
+            metrics.LLM_RETRIES.inc()
+            limiter.pause(delay)
+            continue
+        response_tokens = ratelimit.estimate_tokens(response_text)
+        limiter.consume(response_tokens)
+        _record_usage(prompt_tokens, response_tokens)
+        # Bypassed requests still refresh the cache for the next caller,
+        # but a response the caller cannot parse is never replayed
+        if config.LLM_CACHE_ENABLED:
+            if validate is None or validate(response_text):
+                get_cache().put(key, response_text)
+            else:
+                print("Not caching a Gemini response that failed validation")
+        return response_text
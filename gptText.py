@@ -1,12 +1,18 @@
 import gpt
-import time
+import json
 import re  # Import the regular expression module
+from concurrent.futures import ThreadPoolExecutor
+import config
+import metrics
+import slideir
 
-def process(topic_list, include_code=True):
-    data_list = []
-    for topic in topic_list:
-        dct = {}
-        prompt = f"""
+# What a usable summary / code response contains; responses without it are not cached
+SUMMARY_PATTERN = re.compile(r"<<<TOPIC>>>(.*?)<<<TOPIC>>>.*?<<<SUMMARY_START>>>(.*?)<<<SUMMARY_END>>>", re.DOTALL)
+CODE_PATTERN = re.compile(r"```python(.*?)```", re.DOTALL)
+
+
+def _summary_prompt(topic):
+    return f"""
         Generate comprehensive, in-depth information about: **{topic}**.  Output *strictly* the following JSON-like format.  Do *not* include *any* additional text outside the delimiters.
 
         <<<TOPIC>>>
@@ -32,30 +38,10 @@ def process(topic_list, include_code=True):
         * **Key Concepts:** Cover all *major* key concepts, principles, and applications related to the topic. Don't just skim the surface.
 
         """
-        text = gpt.get_summarise(prompt, topic)
-        #print(f"RAW TEXT:\n{text}") # Debugging
-
-        try:
-            # Use regular expressions for more robust parsing:
-            match = re.search(r"<<<TOPIC>>>(.*?)<<<TOPIC>>>.*?<<<SUMMARY_START>>>(.*?)<<<SUMMARY_END>>>", text, re.DOTALL)
-            if match:
-                dct["Topic"] = match.group(1).strip()
-                summary_text = match.group(2).strip()
-                dct["Summary"] = [line.strip() for line in summary_text.split("\n") if line.strip() and line.startswith("[Summary Sentence")]
-            else:
-                raise ValueError("Could not find expected delimiters in response.")
-
-            #print(dct)
 
-        except Exception as e:
-            print(f"Error parsing topic/summary for '{topic}': {e}")
-            dct["Topic"] = f"Error parsing topic: {topic}"
-            dct["Summary"] = [f"Error parsing summary: {e}"]
 
-
-        dct["Code"] = ""  # Initialize
-        if include_code:
-            code_prompt = f"""
+def _code_prompt(topic):
+    return f"""
             Provide a *short*, relevant Python code snippet directly illustrating a *key* concept from the topic: '{topic}'.
 
             **Requirements:**
@@ -71,36 +57,10 @@ def process(topic_list, include_code=True):
             * **No Explanations:** Do not include any comments, explanations, or docstrings *within* the code.  The code should speak for itself.
             * **Best Practices:** Use good Pythonic style (e.g., meaningful variable names, proper indentation).
             """
-            code = gpt.get_summarise(code_prompt, topic)
-            #print(f"RAW CODE:\n{code}")
-
-            try:
-                # More robust code extraction:
-                code_match = re.search(r"```python(.*?)```", code, re.DOTALL)
-                if code_match:
-                    dct["Code"] = code_match.group(1).strip()
-                else:
-                    dct["Code"] = "# Error: Could not extract code. Check prompt and response."
-            except Exception as e:
-                print(f"Error extracting code for '{topic}': {e}")
-                dct["Code"] = f"# Error extracting code: {e}"
 
-        data_list.append(dct)
-        if len(topic_list) > 1:
-            time.sleep(55)  # Consider using a more robust rate-limiting approach
 
-    return data_list
-
-
-def structured(topic_list, include_code=True):
-    data_list = process(topic_list, include_code)
-    structured_data = []
-    for data in data_list:
-        topic = data["Topic"]
-        code = data.get("Code", "")
-        summary = data.get("Summary", "")
-
-        prompt = f"""
+def _outline_prompt(topic, summary, code=""):
+    prompt = f"""
         Create a detailed presentation outline for the topic: '{topic}'. Structure the outline as a series of slides.
 
         **Overall Presentation Structure:**
@@ -142,17 +102,372 @@ def structured(topic_list, include_code=True):
 
         {summary}
         """
-        if include_code and code:
-            prompt += f"""
+    if code:
+        prompt += f"""
         **Code Snippet (Place in a separate slide):**
 
         ```python
         {code}
         ```
         """
+    return prompt
+
+
+def _single_shot_prompt(topic, include_code):
+    prompt = f"""
+        Create a complete, in-depth presentation about: **{topic}**.  Output *only* a single JSON object that matches the JSON Schema below.  Do *not* wrap it in markdown or add *any* text before or after it.
+
+        **JSON Schema:**
+
+        {json.dumps(slideir.DECK_SCHEMA)}
+
+        **Requirements:**
+
+        *   **Title:** `title` is a concise presentation title.
+        *   **Number of Slides:** Generate approximately 5-7 slides.
+        *   **Slide Titles:** Keep slide titles very short and to the point.
+        *   **Bullet Points:** 3-5 `bullets` per slide. Bullet points should be concise summaries, *not* full sentences. Use keywords and phrases. Aim for 10-20 words per bullet point.
+        *   **Depth:** The content MUST be in-depth, providing significant, non-trivial information for an audience that wants to learn *beyond* the basics.
+        *   **Image Suggestions:** Every slide except code slides has an `image_query`: a *detailed* and *specific* description of an image that directly relates to the slide's content (a diagram, chart, screenshot or conceptual illustration).
+        * **Factual Accuracy:** Ensure all information is factually accurate and up-to-date.
+        """
+    if include_code:
+        prompt += """
+        *   **Code Slide:** Include exactly one slide titled "Code Example" with empty `bullets`, `language` set to "python" and `code` holding a *short* (10-25 lines), correct, runnable Python snippet that illustrates a *key* concept of the topic. No comments or explanations inside the code.
+        """
+    else:
+        prompt += """
+        *   **No Code:** Do not include any `code` fields.
+        """
+    return prompt
+
+
+def _repair_prompt(response, error):
+    return f"""
+        The JSON below was supposed to match this JSON Schema but does not ({error}).
+        Return the corrected JSON object *only*, keeping the content unchanged wherever possible.
+
+        **JSON Schema:**
+
+        {json.dumps(slideir.DECK_SCHEMA)}
+
+        **JSON:**
+
+        {response}
+        """
+
+
+def _batch_prompt(prompts):
+    """Several prompts in one request; answers are split back apart by _split_batch."""
+    parts = [f"""
+        Answer each of the following {len(prompts)} requests independently and in order.
+        Begin each answer with a line `<<<ANSWER [Number]>>>` and follow that request's own format exactly.
+        """]
+    for number, prompt in enumerate(prompts, 1):
+        parts.append(f"\n        <<<REQUEST {number}>>>\n{prompt}")
+    return "".join(parts)
+
+
+def _split_batch(text, count):
+    """Answers of a batched call in request order; None where one is missing."""
+    answers = [None] * count
+    pieces = re.split(r"<<<ANSWER\s*(\d+)>>>", text)
+    for number, answer in zip(pieces[1::2], pieces[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count and answer.strip():
+            answers[index] = answer.strip()
+    return answers
+
+
+def _ask_batch(prompts, topics, stage, use_cache=True, on_token=None, validate=None):
+    """Send prompts as one combined call and return one answer per prompt.
+
+    Answers the model dropped or mangled are asked for again individually.
+    validate checks a single answer (see gpt.get_summarise); the combined
+    response is only cached when every answer in it passes.
+    """
+    if len(prompts) == 1:
+        with metrics.timed(stage):
+            return [gpt.get_summarise(prompts[0], topics[0], use_cache, on_token=on_token, validate=validate)]
+
+    def valid_batch(text):
+        return all(answer is not None and (validate is None or validate(answer))
+                   for answer in _split_batch(text, len(prompts)))
+
+    with metrics.timed(stage):
+        text = gpt.get_summarise(_batch_prompt(prompts), "\n".join(topics), use_cache, on_token=on_token,
+                                 validate=valid_batch)
+    answers = _split_batch(text, len(prompts))
+    for index, answer in enumerate(answers):
+        if answer is None:
+            print(f"Batched answer missing for '{topics[index]}', asking again on its own")
+            with metrics.timed(stage):
+                answers[index] = gpt.get_summarise(prompts[index], topics[index], use_cache, validate=validate)
+    return answers
+
+
+def _emit(progress, event, **data):
+    if progress is not None:
+        progress(event, **data)
+
+
+def _summarise(topic, use_cache=True, progress=None):
+    """Summary call for one topic, parsed into a {"Topic", "Summary"} dict."""
+    with metrics.timed("summary"):
+        text = gpt.get_summarise(_summary_prompt(topic), topic, use_cache, validate=_valid_summary)
+    #print(f"RAW TEXT:\n{text}") # Debugging
+    dct = _parse_summary(topic, text)
+    _emit(progress, "summary", topic=topic)
+    return dct
+
+
+def _valid_summary(text):
+    return SUMMARY_PATTERN.search(text) is not None
+
+
+def _valid_code(text):
+    return CODE_PATTERN.search(text) is not None
+
 
-        slide_data = gpt.get_summarise(prompt, topic)
-        data["Slides"] = slide_data
+def _valid_outline(text):
+    # Needs a real "Slide N:" header; a lone untitled slide of nothing but code is a failed parse
+    if not any(slideir.SLIDE_HEADER.match(line.strip().strip("*#_ ")) for line in text.splitlines()):
+        return False
+    return any(slide.title != "Slide" or slide.bullets for slide in slideir.parse_outline(text).slides)
+
+
+def _valid_deck_json(text):
+    try:
+        slideir.parse_json(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _parse_summary(topic, text):
+    dct = {}
+
+    try:
+        # Use regular expressions for more robust parsing:
+        match = SUMMARY_PATTERN.search(text)
+        if match:
+            dct["Topic"] = match.group(1).strip()
+            summary_text = match.group(2).strip()
+            dct["Summary"] = [line.strip() for line in summary_text.split("\n") if line.strip() and line.startswith("[Summary Sentence")]
+        else:
+            raise ValueError("Could not find expected delimiters in response.")
+
+        #print(dct)
+
+    except Exception as e:
+        print(f"Error parsing topic/summary for '{topic}': {e}")
+        dct["Topic"] = f"Error parsing topic: {topic}"
+        dct["Summary"] = [f"Error parsing summary: {e}"]
+    return dct
+
+
+def _generate_code(topic, use_cache=True, progress=None):
+    """Code-snippet call for one topic; returns the extracted Python code."""
+    with metrics.timed("code"):
+        code = gpt.get_summarise(_code_prompt(topic), topic, use_cache, validate=_valid_code)
+    #print(f"RAW CODE:\n{code}")
+
+    _emit(progress, "code", topic=topic)
+    return _parse_code(topic, code)
+
+
+def _parse_code(topic, code):
+    try:
+        # More robust code extraction:
+        code_match = CODE_PATTERN.search(code)
+        if code_match:
+            return code_match.group(1).strip()
+        else:
+            return "# Error: Could not extract code. Check prompt and response."
+    except Exception as e:
+        print(f"Error extracting code for '{topic}': {e}")
+        return f"# Error extracting code: {e}"
+
+
+def _outline(data, include_code, use_cache=True, progress=None):
+    topic = data["Topic"]
+    code = data.get("Code", "") if include_code else ""
+    prompt = _outline_prompt(topic, data.get("Summary", ""), code)
+    on_token = None
+    if progress is not None:
+        # Stream the outline so clients see it being written
+        on_token = lambda text: progress("outline_token", topic=topic, text=text)
+    with metrics.timed("outline"):
+        slide_data = gpt.get_summarise(prompt, topic, use_cache, on_token=on_token, validate=_valid_outline)
+    _emit(progress, "outline", topic=topic)
+    return slide_data
+
+
+def _append_code_slide(slide_data, code):
+    """Add the code snippet as a final slide in the outline's own format."""
+    number = len(re.findall(r"Slide\s*\d+:", slide_data)) + 1
+    slide_data = slide_data.rstrip()
+    if not slide_data.endswith("---"):
+        slide_data += "\n---"
+    return f"{slide_data}\nSlide {number}: Code Example\n```python\n{code}\n```\n---\n"
+
+
+def process(topic_list, include_code=True, use_cache=True, progress=None):
+    data_list = []
+    for topic in topic_list:
+        dct = _summarise(topic, use_cache, progress)
+        dct["Code"] = _generate_code(topic, use_cache, progress) if include_code else ""
+        data_list.append(dct)
+
+    return data_list
+
+
+def structured(topic_list, include_code=True, concurrent=None, use_cache=True, progress=None, batch=None):
+    """Summary, code and outline for every topic, in topic order.
+
+    With concurrent=True (the default, see config.LLM_CONCURRENT) the summary
+    and code calls for all topics run at once, and each topic's outline call
+    starts as soon as its own summary arrives. The code snippet is then added
+    as the last slide of the outline instead of being placed by the model.
+    use_cache=False skips the response cache lookups for this request.
+    progress, if given, is called as progress(event, **data) after each
+    call ("summary", "code", "outline") and for every streamed outline
+    chunk ("outline_token").
+
+    With batch=True (see config.LLM_BATCH_TOPICS) up to config.LLM_BATCH_SIZE
+    topics share each summary, code and outline call, so a batch costs three
+    round-trips however many topics it holds.
+    """
+    if concurrent is None:
+        concurrent = config.LLM_CONCURRENT
+    if batch is None:
+        batch = config.LLM_BATCH_TOPICS
+    if batch and len(topic_list) > 1:
+        return _structured_batched(topic_list, include_code, concurrent, use_cache, progress)
+    if concurrent:
+        return _structured_concurrent(topic_list, include_code, use_cache, progress)
+
+    data_list = process(topic_list, include_code, use_cache, progress)
+    structured_data = []
+    for data in data_list:
+        data["Slides"] = _outline(data, include_code, use_cache, progress)
         structured_data.append(data)
-        time.sleep(20)  # Again, consider a more robust rate-limiting solution
-    return structured_data
\ No newline at end of file
+    return structured_data
+
+
+def _structured_concurrent(topic_list, include_code, use_cache, progress):
+    workers = max(1, min(config.LLM_FANOUT_WORKERS, len(topic_list)))
+
+    def summary_then_outline(topic):
+        data = _summarise(topic, use_cache, progress)
+        data["Slides"] = _outline(data, False, use_cache, progress)
+        return data
+
+    # Separate pools so a topic waiting on its outline never starves a code call
+    with ThreadPoolExecutor(max_workers=workers) as topic_pool, \
+            ThreadPoolExecutor(max_workers=workers) as code_pool:
+        code_futures = [code_pool.submit(metrics.propagate(_generate_code), topic, use_cache, progress) if include_code else None
+                        for topic in topic_list]
+        topic_futures = [topic_pool.submit(metrics.propagate(summary_then_outline), topic) for topic in topic_list]
+
+        structured_data = []
+        for topic_future, code_future in zip(topic_futures, code_futures):
+            data = topic_future.result()
+            data["Code"] = code_future.result() if code_future else ""
+            if data["Code"]:
+                data["Slides"] = _append_code_slide(data["Slides"], data["Code"])
+            structured_data.append(data)
+    return structured_data
+
+
+def _structured_batch(topics, include_code, use_cache, progress):
+    """Summary, code and outline for one batch of topics using one call each."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        code_future = None
+        if include_code:
+            code_future = pool.submit(metrics.propagate(_ask_batch), [_code_prompt(topic) for topic in topics],
+                                      topics, "code", use_cache, validate=_valid_code)
+        summaries = _ask_batch([_summary_prompt(topic) for topic in topics], topics, "summary", use_cache,
+                               validate=_valid_summary)
+        codes = code_future.result() if code_future else [""] * len(topics)
+
+    data_list = []
+    for topic, summary, code in zip(topics, summaries, codes):
+        data = _parse_summary(topic, summary)
+        _emit(progress, "summary", topic=topic)
+        data["Code"] = _parse_code(topic, code) if include_code else ""
+        if include_code:
+            _emit(progress, "code", topic=topic)
+        data_list.append(data)
+
+    on_token = None
+    if progress is not None:
+        label = ", ".join(topics)
+        on_token = lambda text: progress("outline_token", topic=label, text=text)
+    prompts = [_outline_prompt(data["Topic"], data.get("Summary", ""), data["Code"]) for data in data_list]
+    outlines = _ask_batch(prompts, [data["Topic"] for data in data_list], "outline", use_cache, on_token=on_token,
+                          validate=_valid_outline)
+    for data, outline in zip(data_list, outlines):
+        data["Slides"] = outline
+        _emit(progress, "outline", topic=data["Topic"])
+    return data_list
+
+
+def _structured_batched(topic_list, include_code, concurrent, use_cache, progress):
+    size = max(1, config.LLM_BATCH_SIZE)
+    batches = [topic_list[start:start + size] for start in range(0, len(topic_list), size)]
+    if not concurrent or len(batches) == 1:
+        return [data for topics in batches for data in _structured_batch(topics, include_code, use_cache, progress)]
+
+    workers = max(1, min(config.LLM_FANOUT_WORKERS, len(batches)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(metrics.propagate(_structured_batch), topics, include_code, use_cache, progress) for topics in batches]
+        return [data for future in futures for data in future.result()]
+
+
+def _single_shot_deck(topic, include_code, use_cache=True, progress=None):
+    """One structured-output call for a topic, parsed straight into a slideir.Deck.
+
+    An invalid response gets one repair call; if that is still invalid the
+    topic falls back to the summary -> outline chain.
+    """
+    on_token = None
+    if progress is not None:
+        on_token = lambda text: progress("outline_token", topic=topic, text=text)
+    with metrics.timed("single_shot"):
+        text = gpt.get_summarise(_single_shot_prompt(topic, include_code), topic, use_cache, on_token=on_token,
+                                 validate=_valid_deck_json)
+    try:
+        deck = slideir.parse_json(text)
+    except ValueError as e:
+        print(f"Single-shot response for '{topic}' is invalid ({e}), asking for a repair")
+        try:
+            with metrics.timed("single_shot_repair"):
+                repaired = gpt.get_summarise(_repair_prompt(text, e), topic, use_cache, validate=_valid_deck_json)
+            deck = slideir.parse_json(repaired)
+        except ValueError as e:
+            print(f"Repair for '{topic}' failed ({e}), falling back to the outline chain")
+            data = structured([topic], include_code, concurrent=False, use_cache=use_cache,
+                              progress=progress, batch=False)[0]
+            return slideir.parse_outline(data["Slides"])
+    _emit(progress, "outline", topic=topic)
+    return deck
+
+
+def single_shot(topic_list, include_code=True, concurrent=None, use_cache=True, progress=None):
+    """One slideir.Deck per topic, each from a single JSON-schema-constrained call.
+
+    The alternative to structured(): no summary call and no summary re-sent
+    in a second prompt. Topics run concurrently unless concurrent=False
+    (config.LLM_CONCURRENT by default); progress events are "outline_token"
+    while the response streams and "outline" once it has been parsed.
+    """
+    if concurrent is None:
+        concurrent = config.LLM_CONCURRENT
+    if not concurrent or len(topic_list) == 1:
+        return [_single_shot_deck(topic, include_code, use_cache, progress) for topic in topic_list]
+
+    workers = max(1, min(config.LLM_FANOUT_WORKERS, len(topic_list)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(metrics.propagate(_single_shot_deck), topic, include_code, use_cache, progress) for topic in topic_list]
+        return [future.result() for future in futures]
@@ -0,0 +1,59 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+# Every value comes from config.py, so project.env configures the server too.
+import os
+import signal
+import threading
+import time
+# Not `import config`: gunicorn reads a module-level `config` as its own setting
+import config as app_config
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = app_config.SERVER_BIND
+# Jobs are per worker process, see SERVER_WORKERS in config.py
+workers = app_config.SERVER_WORKERS
+# Threads serve requests, including long-lived SSE progress streams;
+# generation itself runs on the job queue's own workers.
+worker_class = "gthread"
+threads = app_config.SERVER_THREADS
+# Long enough for a running deck to finish before the worker is killed
+graceful_timeout = app_config.SERVER_GRACEFUL_TIMEOUT
+timeout = app_config.SERVER_GRACEFUL_TIMEOUT + 30
+
+# When this worker's drain must be over, set once SIGTERM arrives
+_drain_deadline = None
+
+
+def _drain_budget():
+    # A little under graceful_timeout, so the master never has to SIGKILL the worker
+    return max(1, app_config.SERVER_GRACEFUL_TIMEOUT - 5)
+
+
+def post_worker_init(worker):
+    # On SIGTERM keep serving HTTP while accepted jobs finish: /api/health reports
+    # 503 "draining", new generations get 503 and clients can still poll, stream
+    # and download their decks. Only then is gunicorn's own exit handler run.
+    import pptgen
+    stop_worker = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        global _drain_deadline
+        if _drain_deadline is not None:
+            return
+        _drain_deadline = time.monotonic() + _drain_budget()
+        pptgen.stop_accepting()
+
+        def drain_then_stop():
+            pptgen.drain(max(0, _drain_deadline - time.monotonic()))
+            stop_worker(signum, frame)
+
+        threading.Thread(target=drain_then_stop, name="drain", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # Normally the jobs already finished while the worker was still serving;
+    # wait only for whatever is left of the budget (nothing after SIGINT/SIGQUIT)
+    import pptgen
+    remaining = _drain_deadline - time.monotonic() if _drain_deadline is not None else 0
+    pptgen.drain(max(0, remaining))
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class ImageCache:
+    """On-disk image store shared by every job and worker process.
+
+    Files are named by the sha256 of their content and written atomically
+    (temp file + rename). A SQLite index maps each search query to the
+    Pexels photo IDs it returned and each photo ID to its file, so a repeat
+    query needs no network I/O at all. Once the store grows past max_bytes,
+    the least recently used photos are evicted, except those used within
+    the last `grace` seconds, which a running job may still be embedding.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, grace=600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), timeout=30,
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS photos ("
+                " photo_id TEXT PRIMARY KEY,"
+                " filename TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS queries ("
+                " query TEXT NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " photo_id TEXT NOT NULL,"
+                " PRIMARY KEY (query, position))"
+            )
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def lookup(self, query, n=1):
+        """Cached image paths for the first n results of query, or None."""
+        query = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.photo_id, p.filename FROM queries q JOIN photos p ON p.photo_id = q.photo_id"
+                " WHERE q.query = ? AND q.position < ? ORDER BY q.position",
+                (query, n),
+            ).fetchall()
+            paths = [self._path(filename) for _, filename in rows]
+            if len(rows) < n or not all(os.path.exists(path) for path in paths):
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.executemany("UPDATE photos SET accessed_at = ? WHERE photo_id = ?",
+                                     [(now, photo_id) for photo_id, _ in rows])
+            self.hits += 1
+            return paths
+
+    def get_photo(self, photo_id):
+        """Path of a cached photo by its Pexels ID, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT filename FROM photos WHERE photo_id = ?",
+                                   (str(photo_id),)).fetchone()
+            if row is None or not os.path.exists(self._path(row[0])):
+                return None
+            with self._db:
+                self._db.execute("UPDATE photos SET accessed_at = ? WHERE photo_id = ?",
+                                 (time.time(), str(photo_id)))
+            return self._path(row[0])
+
+    def remember(self, query, position, photo_id):
+        """Record that `photo_id` is result number `position` for query."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO queries (query, position, photo_id) VALUES (?, ?, ?)",
+                             (normalize_query(query), position, str(photo_id)))
+
+    def store(self, photo_id, source_path):
+        """Move a downloaded image into the cache and return its cached path."""
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        filename = digest.hexdigest() + os.path.splitext(source_path)[1]
+        path = self._path(filename)
+        if not os.path.exists(path):
+            fd, partial_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            os.close(fd)
+            shutil.move(source_path, partial_path)
+            os.replace(partial_path, path)
+        else:
+            os.remove(source_path)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO photos (photo_id, filename, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (str(photo_id), filename, os.path.getsize(path), time.time()),
+            )
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Caller holds the lock and an open transaction
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM photos").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cutoff = time.time() - self.grace
+        for photo_id, filename, size in self._db.execute(
+            "SELECT photo_id, filename, size FROM photos WHERE accessed_at < ? ORDER BY accessed_at",
+            (cutoff,),
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM photos WHERE photo_id = ?", (photo_id,))
+            self._db.execute("DELETE FROM queries WHERE photo_id = ?", (photo_id,))
+            # Content-addressed files can be shared by several photo IDs
+            still_used = self._db.execute("SELECT 1 FROM photos WHERE filename = ?", (filename,)).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._path(filename))
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM photos"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
@@ -0,0 +1,281 @@
+import math
+import queue
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """A single unit of background work and its outcome."""
+
+    def __init__(self, func, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Set for jobs submitted with submit_shared()
+        self.key = None
+        self.subscribers = 1
+        self.events = []
+        self._done = threading.Event()
+        self._events_changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def wait(self, timeout=None):
+        """Block until the job has finished; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def _finish(self, status):
+        with self._events_changed:
+            self.finished_at = time.time()
+            self.status = status
+            self._events_changed.notify_all()
+        self._done.set()
+
+    def emit(self, event, **data):
+        """Record a progress event; safe to call from any thread."""
+        with self._events_changed:
+            self.events.append((event, data))
+            self._events_changed.notify_all()
+
+    def iter_events(self, start=0, heartbeat=15):
+        """Yield (index, event, data) from `start` until the job has finished.
+
+        Yields None whenever `heartbeat` seconds pass without a new event so
+        callers can keep idle connections alive.
+        """
+        index = start
+        while True:
+            with self._events_changed:
+                if index >= len(self.events) and not self.finished:
+                    self._events_changed.wait(heartbeat)
+                pending = self.events[index:]
+                finished = self.finished
+            if not pending and not finished:
+                yield None
+            for event, data in pending:
+                yield index, event, data
+                index += 1
+            if finished and not pending:
+                return
+
+    def to_dict(self):
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "subscribers": self.subscribers,
+        }
+        if self.status == FAILED:
+            info["error"] = self.error
+        return info
+
+
+class QueueFull(Exception):
+    """The queue is not taking new jobs right now; retry after `retry_after` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueClosed(QueueFull):
+    """The queue is draining before shutdown."""
+
+
+class JobQueue:
+    """FIFO queue served by a fixed pool of daemon worker threads.
+
+    At most `max_active` jobs (0 = no limit) may be queued or running at once;
+    submitting beyond that raises QueueFull. drain() stops admissions and
+    waits for the jobs already accepted to finish.
+    """
+
+    def __init__(self, workers=2, retention=3600, result_ttl=300, max_active=0):
+        self.workers = max(1, workers)
+        self.retention = retention
+        self.result_ttl = result_ttl
+        self.max_active = max_active
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._shared = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._threads = []
+        self._active = 0
+        self._closed = False
+        self._average_seconds = None
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) and return its Job immediately."""
+        return self._enqueue(Job(func, args, kwargs))
+
+    def submit_with_progress(self, func, *args, **kwargs):
+        """Like submit(), but also passes progress=job.emit to func."""
+        job = Job(func, args, kwargs)
+        job.kwargs["progress"] = job.emit
+        return self._enqueue(job)
+
+    def submit_shared(self, key, func, *args, **kwargs):
+        """Like submit_with_progress(), but identical requests share one job.
+
+        A request whose key matches a queued or running job attaches to it,
+        and one matching a job that succeeded less than result_ttl seconds
+        ago gets that finished job back. Returns (job, created).
+        """
+        with self._lock:
+            job = self._shared.get(key)
+            if job is not None and (not job.finished or (
+                    job.status == DONE and job.finished_at >= time.time() - self.result_ttl)):
+                job.subscribers += 1
+                return job, False
+            job = Job(func, args, kwargs)
+            job.kwargs["progress"] = job.emit
+            job.key = key
+            # Published only once admitted, so nobody attaches to a job that was refused
+            self._register(job)
+            self._shared[key] = job
+        return self._dispatch(job), True
+
+    def forget(self, key):
+        """Stop handing out the shared job for key, e.g. once its result is gone."""
+        with self._lock:
+            self._shared.pop(key, None)
+
+    def _admit(self):
+        # Caller holds self._lock
+        if self._closed:
+            raise QueueClosed("Server is shutting down", self.retry_after())
+        if self.max_active and self._active >= self.max_active:
+            raise QueueFull("Too many presentations are being generated, try again shortly",
+                            self.retry_after())
+
+    def retry_after(self):
+        """Rough seconds until a slot frees up, from the average job duration."""
+        average = self._average_seconds or 30
+        return max(1, math.ceil(average / self.workers))
+
+    def _enqueue(self, job):
+        with self._lock:
+            self._register(job)
+        return self._dispatch(job)
+
+    def _register(self, job):
+        # Caller holds self._lock; raises QueueFull if the job is not admitted
+        self._admit()
+        self._prune()
+        self._jobs[job.id] = job
+        self._active += 1
+
+    def _dispatch(self, job):
+        self.start()
+        job.emit("queued", job_id=job.id)
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self):
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": self._active,
+                "queued": self._queue.qsize(),
+                "max_active": self.max_active,
+                "draining": self._closed,
+                "average_seconds": self._average_seconds,
+            }
+
+    def close(self):
+        """Refuse new jobs from now on; accepted ones keep running."""
+        with self._lock:
+            self._closed = True
+
+    def drain(self, timeout=None):
+        """Refuse new jobs and wait for accepted ones; returns False on timeout."""
+        with self._idle:
+            self._closed = True
+            drained = self._idle.wait_for(lambda: self._active == 0, timeout)
+        if drained:
+            self.shutdown(wait=False)
+        return drained
+
+    def shutdown(self, wait=True):
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.retention
+        stale = [job_id for job_id, job in self._jobs.items()
+                 if job.finished and job.finished_at < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
+        result_cutoff = time.time() - self.result_ttl
+        expired = [key for key, job in self._shared.items()
+                   if job.status == FAILED or (job.status == DONE and job.finished_at < result_cutoff)]
+        for key in expired:
+            del self._shared[key]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.emit("started")
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                job.emit("done", result=job.result)
+                job._finish(DONE)
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                # Not "error": EventSource uses that name for its own connection errors
+                job.emit("failed", error=job.error)
+                job._finish(FAILED)
+            finally:
+                with self._idle:
+                    self._active -= 1
+                    seconds = job.finished_at - job.started_at
+                    if self._average_seconds is None:
+                        self._average_seconds = seconds
+                    else:
+                        self._average_seconds = 0.8 * self._average_seconds + 0.2 * seconds
+                    self._idle.notify_all()
+                self._queue.task_done()
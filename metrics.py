@@ -0,0 +1,256 @@
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+import profiling
+
+# Latency buckets in seconds, from a fast cache hit up to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge set directly or read from `callback` (returning {label values: value}) at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self):
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                print(f"Metric {self.name} failed: {e}")
+                return []
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in sorted(values.items())
+                if value is not None]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def collect(self):
+        with self._lock:
+            series = {key: ([*counts], count, total) for key, (counts, count, total) in self._series.items()}
+        lines = []
+        for key, (counts, count, total) in sorted(series.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', bound)])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labels=()):
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name, documentation, labels=(), callback=None):
+    return REGISTRY.register(Gauge(name, documentation, labels, callback))
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+def render():
+    return REGISTRY.render()
+
+
+STAGE_SECONDS = histogram("pptgen_stage_seconds", "Time spent in each pipeline stage.", ["stage"])
+STAGE_ERRORS = counter("pptgen_stage_errors_total", "Pipeline stages that raised an error.", ["stage"])
+LLM_RETRIES = counter("pptgen_llm_retries_total", "Gemini calls retried after a rate-limit response.")
+LLM_CALLS = counter("pptgen_llm_calls_total", "Gemini calls that reached the API.")
+LLM_TOKENS = counter("pptgen_llm_tokens_total", "Estimated tokens sent to and received from Gemini.", ["kind"])
+CACHE_LOOKUPS = counter("pptgen_cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+IMAGE_BYTES = counter("pptgen_image_bytes_total", "Image bytes downloaded and embedded.", ["kind"])
+GENERATIONS = counter("pptgen_generations_total", "Finished deck generations by outcome.", ["outcome"])
+
+
+# Per-request timing: stages add to the collector of the request they run for
+_current_request = contextvars.ContextVar("pptgen_request", default=None)
+
+
+class RequestTimings:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            count, total = self.stages.get(stage, (0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {stage: {"count": count, "seconds": round(total, 4)}
+                      for stage, (count, total) in self.stages.items()}
+        return {
+            "request_id": self.request_id,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+        }
+
+
+@contextlib.contextmanager
+def request_timings(request_id, **fields):
+    """Collect stage timings for one request and log them as a JSON line when it ends."""
+    timings = RequestTimings(request_id)
+    token = _current_request.set(timings)
+    outcome = "ok"
+    try:
+        yield timings
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        _current_request.reset(token)
+        print(json.dumps({"event": "request_timings", "outcome": outcome, **fields, **timings.to_dict()}))
+
+
+def current_request_id():
+    timings = _current_request.get()
+    return timings.request_id if timings is not None else None
+
+
+def observe(stage, seconds):
+    """Record `seconds` spent in `stage`, for the metrics and the current request."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _current_request.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """Observe how long the block takes as `stage`, and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def propagate(func):
+    """Wrap func so it runs in the caller's context, e.g. before handing it to a thread pool.
+
+    The work then counts towards the caller's request timings and, if the
+    request is being profiled, its thread is sampled while func runs.
+    Wrap once per submission: a context can only be entered by one thread at a time.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(_attached, func, args, kwargs)
+
+
+def _attached(func, args, kwargs):
+    with profiling.attach_thread():
+        return func(*args, **kwargs)
@@ -1,23 +1,32 @@
-import re
+import io
 import os
+import json
 import random
-from flask import Flask, request, jsonify, send_file, render_template
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from flask import Flask, Response, g, request, jsonify, send_file, render_template
 from flask_cors import CORS  # Import for handling CORS
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN
-from pptx.dml.color import RGBColor
+import gpt
 import gptText
 import addphoto
+import config
+import deck_templates
+import deckstore
+import metrics
+import profiling
+import slideir
+from jobs import JobQueue, QueueClosed, QueueFull, DONE, FAILED
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Define upload and output directories
-UPLOAD_FOLDER = 'uploads'
+# Define the output directory for the filesystem deck storage (created on first use)
 OUTPUT_FOLDER = 'static/presentations'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 # Define template paths
 TEMPLATES = {
@@ -27,81 +36,205 @@ TEMPLATES = {
     4: "template/dark.pptx",
 }
 
-# Store the latest generated presentation for the /result endpoint
-current_presentation = None
+# Templates are parsed once and copied from memory for each deck
+template_registry = deck_templates.TemplateRegistry(TEMPLATES)
 
-def gettext(topic_list, code: bool):
-    slides_data = gptText.structured(topic_list=topic_list, include_code=code)
-    if slides_data and isinstance(slides_data, list) and len(slides_data) > 0 and 'Slides' in slides_data[0]:
-        return slides_data[0]['Slides']
-    else:
-        return ""
-
-def getphoto(slide_data):
-    os.makedirs('images', exist_ok=True)
-    pattern = r"Image Suggestion:\s*(.+)"
-    image_suggestions = re.findall(pattern, slide_data)
-    image_paths = []
-    for suggestion in image_suggestions:
-        try:
-            image_result = addphoto.get_images(suggestion, 1)
-            if image_result:
-                image_paths.append(image_result[0])
-            else:
-                print(f"No image found for suggestion: {suggestion}")
-        except Exception as e:
-            print(f"Error getting image for suggestion '{suggestion}': {e}")
-    return image_paths
-
-def create_presentation(topic, template_choice=1, include_code=False):
-    """Create a presentation based on topic and template choice"""
-    # Convert topic to list if it's a string
-    topic_list = [topic] if isinstance(topic, str) else topic
-    
-    # Generate a unique filename for the presentation
-    presentation_id = f"presentation_{random.randint(1000, 9999)}"
-    output_filename = f"{OUTPUT_FOLDER}/{presentation_id}.pptx"
-    
-    # Get slide data and image paths
-    slide_data = gettext(topic_list, include_code)
-    image_paths = getphoto(slide_data)
+# Finished decks are indexed by ID and garbage-collected by age and total size
+deck_store = deckstore.DeckStore(
+    deckstore.make_backend(config.DECK_STORAGE, OUTPUT_FOLDER, config.DECK_STORAGE_BUCKET,
+                           config.DECK_STORAGE_PREFIX, config.DECK_STORAGE_ENDPOINT),
+    index_path=config.DECK_INDEX_PATH, max_age=config.DECK_MAX_AGE_SECONDS,
+    max_bytes=config.DECK_MEMORY_MAX_BYTES if config.DECK_STORAGE == "memory" else config.DECK_MAX_BYTES,
+    interval=config.DECK_GC_INTERVAL_SECONDS)
 
-    if image_paths is None:
-        image_paths = []
+# Generation runs on background workers; requests only enqueue and poll
+job_queue = JobQueue(workers=config.GENERATION_WORKERS, retention=config.JOB_RETENTION_SECONDS,
+                     result_ttl=config.RESULT_CACHE_SECONDS, max_active=config.MAX_ACTIVE_GENERATIONS)
 
-    # Get template path
-    template_path = TEMPLATES.get(template_choice, None)
-    
-    # Load the selected template or create a blank presentation
-    if template_path and os.path.exists(template_path):
-        prs = Presentation(template_path)
-        # Clear all existing slides
-        xml_slides = prs.slides._sldIdLst  # Access the slide ID list
-        slides = list(xml_slides)
-        for slide in slides:
-            xml_slides.remove(slide)  # Remove each slide
+def warm_up():
+    """Load templates and create the shared Gemini and HTTP clients before serving traffic."""
+    template_registry.load_all()
+    try:
+        gpt.warm_up()
+    except Exception as e:
+        print(f"Gemini warm-up failed: {e}")
+    addphoto.warm_up()
+    deck_store.start_collector()
+
+def stop_accepting():
+    """Refuse new generations (503) and report draining on /api/health; running jobs continue."""
+    print("No longer accepting generation jobs")
+    job_queue.close()
+
+def drain(timeout=None):
+    """Stop accepting generations and wait for running ones before the process exits."""
+    print("Draining generation jobs...")
+    if job_queue.drain(timeout if timeout is not None else config.SERVER_GRACEFUL_TIMEOUT):
+        print("All generation jobs finished")
+    else:
+        print("Timed out waiting for generation jobs")
+    deck_store.stop_collector()
+
+def gettext(topic_list, code: bool, use_cache=True, progress=None, batch=None, mode=None):
+    """Outline every topic and parse them into one slideir.Deck.
+
+    mode is "outline" or "single_shot" (config.GENERATION_MODE by default).
+    A single topic gives its own deck; several topics give one deck with a
+    section per topic, each opened by a divider slide.
+    """
+    if mode is None:
+        mode = config.GENERATION_MODE
+    if mode == "single_shot":
+        decks = gptText.single_shot(topic_list, include_code=code, use_cache=use_cache, progress=progress)
+    elif mode == "outline":
+        slides_data = gptText.structured(topic_list=topic_list, include_code=code, use_cache=use_cache,
+                                         progress=progress, batch=batch)
+        decks = [slideir.parse_outline(data.get('Slides', "")) for data in slides_data]
     else:
-        prs = Presentation()
+        raise ValueError(f"Unknown generation mode: {mode}")
+    if len(decks) == 1:
+        return decks[0]
+    sections = [(deck.title or topic, deck) for topic, deck in zip(topic_list, decks)]
+    return slideir.combine(sections, title=" & ".join(topic_list))
+
+def getphoto(deck, workspace, pool, stats=None, progress=None):
+    """Start fetching one image per slide into `workspace` on `pool`.
+
+    Returns slide index -> Future of the image path (None if none was found)
+    without waiting, so rendering can start while the downloads run.
+    """
+    suggestions = deck.image_queries()
+
+    def on_result(index, path):
+        if path is None:
+            print(f"No image found for suggestion: {suggestions[index]}")
+        if progress is not None:
+            progress("image", slide=index, query=suggestions[index], ok=path is not None)
+
+    return addphoto.submit_images(pool, suggestions, workspace, stats=stats, on_result=on_result)
+
+# python-pptx is imported by the functions that draw slides, not at startup
+
+def _add_slide_title(slide, text):
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    title_box = slide.shapes.add_textbox(Inches(1), Inches(0.3), Inches(8), Inches(1))
+    title_frame = title_box.text_frame
+    title_frame.text = text
+    title_p = title_frame.paragraphs[0]
+    title_p.font.bold = True
+    title_p.font.size = Pt(32)
+    title_p.alignment = PP_ALIGN.CENTER
+
+def _add_code_slide(prs, layout, title, code):
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import MSO_AUTO_SIZE
+    from pptx.dml.color import RGBColor
+    code_slide = prs.slides.add_slide(layout)
+    _add_slide_title(code_slide, title)
+
+    code_box = code_slide.shapes.add_textbox(Inches(1), Inches(1.5), Inches(8), Inches(5))
+    code_tf = code_box.text_frame
+    code_tf.word_wrap = True
+    code_tf.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
+    p = code_tf.add_paragraph()
+    p.text = code
+    p.font.name = 'Courier New'
+    p.font.size = Pt(10)
+    p.font.color.rgb = RGBColor(255, 255, 255)
+    p.font.fill.solid()
+    p.font.fill.fore_color.rgb = RGBColor(40, 40, 40)
+    return code_slide
+
+def _add_image(slide, img_path):
+    from pptx.util import Inches
+    try:
+        # Define the dimensions for the image
+        left = Inches(6.5)  # Place the image on the right side
+        top = Inches(1)  # Align the image with the top of the content
+        width = Inches(3)  # Elongated width
+        height = Inches(4)  # Elongated height
+
+        # Add the image to the slide
+        slide.shapes.add_picture(img_path, left, top, width, height)
+    except FileNotFoundError:
+        print(f"Image file not found: {img_path}")
+    except Exception as e:
+        print(f"Error adding image: {e}")
+
+def _add_image_placeholder(slide):
+    """Grey box in the picture area for an image that did not arrive in time"""
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.dml.color import RGBColor
+    box = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(6.5), Inches(1), Inches(3), Inches(4))
+    box.fill.solid()
+    box.fill.fore_color.rgb = RGBColor(220, 220, 220)
+    box.line.fill.background()
+    box.text_frame.text = "Image unavailable"
+    p = box.text_frame.paragraphs[0]
+    p.alignment = PP_ALIGN.CENTER
+    p.font.size = Pt(14)
+    p.font.color.rgb = RGBColor(90, 90, 90)
+
+def _place_images(image_slots, images, timeout):
+    """Add each slide's image as soon as it is ready, waiting at most `timeout` seconds overall"""
+    pending = {}
+    for index, slide in image_slots.items():
+        image = images[index]
+        if isinstance(image, Future):
+            pending[image] = index
+        elif image:
+            _add_image(slide, image)
+
+    try:
+        for future in as_completed(list(pending), timeout=timeout):
+            index = pending.pop(future)
+            if future.result():
+                _add_image(image_slots[index], future.result())
+    except FuturesTimeoutError:
+        print(f"Timed out waiting for {len(pending)} image(s); using placeholders")
+        for index in pending.values():
+            _add_image_placeholder(image_slots[index])
+
+def render_presentation(deck, images, template_choice, output, progress=None, image_timeout=None):
+    """Build the pptx from a parsed slideir.Deck and per-slide images and save it
+
+    `output` is a file path or a writable binary file object (e.g. BytesIO).
+
+    `images` maps slide index to an image path or to a Future of one. Text
+    slides are rendered first; pending images are then slotted in as each
+    download finishes, and any still missing after `image_timeout` seconds
+    (config.IMAGE_WAIT_SECONDS by default) get a placeholder.
+    """
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import MSO_AUTO_SIZE, PP_ALIGN
+    if images is None:
+        images = {}
+    if image_timeout is None:
+        image_timeout = config.IMAGE_WAIT_SECONDS
+    image_slots = {}
+
+    # Copy the selected template (or the default one) without any slides
+    prs, template = template_registry.new_presentation(template_choice)
 
     # Add a blank slide layout to start fresh
-    blank_slide_layout = prs.slide_layouts[6]
+    blank_slide_layout = prs.slide_layouts[template.blank_layout]
 
-    # Extract the title from the slide data
-    title_match = re.search(r"Title:\s*(.*)", slide_data)
-    if title_match:
-        overall_title = title_match.group(1).strip()
-        title_slide_layout = prs.slide_layouts[0]
+    if deck.title:
+        title_slide_layout = prs.slide_layouts[template.title_layout]
         slide = prs.slides.add_slide(title_slide_layout)
 
         # Check if the title placeholder exists
         if slide.shapes.title:
             title = slide.shapes.title
-            title.text = overall_title
+            title.text = deck.title
         else:
             # Add a new text box for the title if the placeholder doesn't exist
             title_box = slide.shapes.add_textbox(Inches(0.25), Inches(0.5), Inches(9), Inches(1.5))
             title_frame = title_box.text_frame
-            title_frame.text = overall_title
+            title_frame.text = deck.title
             title_p = title_frame.paragraphs[0]
             title_p.font.bold = True
             title_p.font.size = Pt(32)
@@ -112,30 +245,32 @@ def create_presentation(topic, template_choice=1, include_code=False):
             subtitle = slide.placeholders[1]
             subtitle.text = "Generated Presentation"
 
-    # Split the slide data into individual slides
-    slides = re.split(r"---", slide_data)
-    image_index = 0
-
-    for slide_content in slides:
-        slide_content = slide_content.strip()
-        if not slide_content:
+    render_start = time.perf_counter()
+    for slide_index, slide_ir in enumerate(deck.slides):
+        # Section dividers reuse the title layout
+        if slide_ir.section:
+            slide = prs.slides.add_slide(prs.slide_layouts[template.title_layout])
+            if slide.shapes.title:
+                slide.shapes.title.text = slide_ir.title
+            else:
+                _add_slide_title(slide, slide_ir.title)
+            for placeholder in list(slide.placeholders)[1:]:
+                placeholder.element.getparent().remove(placeholder.element)
+            if progress is not None:
+                progress("slide", index=slide_index, title=slide_ir.title)
             continue
 
-        # Extract the slide title
-        title_match = re.search(r"Slide\s*\d+:\s*(.*)", slide_content)
-        slide_title = title_match.group(1).strip() if title_match else "Slide"
+        # A slide with nothing but code becomes the code slide itself
+        if slide_ir.code_only:
+            for block in slide_ir.code_blocks:
+                _add_code_slide(prs, blank_slide_layout, slide_ir.title, block.code)
+            if progress is not None:
+                progress("slide", index=slide_index, title=slide_ir.title)
+            continue
 
         # Add a new slide using the blank layout
         slide = prs.slides.add_slide(blank_slide_layout)
-
-        # Add the title to the slide
-        title_box = slide.shapes.add_textbox(Inches(1), Inches(0.3), Inches(8), Inches(1))
-        title_frame = title_box.text_frame
-        title_frame.text = slide_title
-        title_p = title_frame.paragraphs[0]
-        title_p.font.bold = True
-        title_p.font.size = Pt(32)
-        title_p.alignment = PP_ALIGN.CENTER
+        _add_slide_title(slide, slide_ir.title)
 
         # Add the content to the slide
         content_box = slide.shapes.add_textbox(Inches(0.5), Inches(1), Inches(6), Inches(5))
@@ -143,142 +278,369 @@ def create_presentation(topic, template_choice=1, include_code=False):
         tf.word_wrap = True
         tf.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
 
-        lines = slide_content.split("\n")
-        for line in lines:
-            line = line.strip()
+        for bullet in slide_ir.bullets:
+            p = tf.add_paragraph()
+            p.text = bullet
+            p.level = 0
+            p.font.size = Pt(20)
 
-            if line.startswith("Slide") and ":" in line:
-                continue
-            elif line.startswith("Image Suggestion:"):
-                continue
-            elif line.startswith("-"):
-                p = tf.add_paragraph()
-                p.text = line[1:].strip()
-                p.level = 0
-                p.font.size = Pt(20)
-            elif line.startswith("```"):
-                code_match = re.search(r"```[a-zA-Z]*\n(.*?)```", slide_content, re.DOTALL)
-                if code_match:
-                    code = code_match.group(1).strip()
-                    code_slide = prs.slides.add_slide(blank_slide_layout)
-                    code_title_box = code_slide.shapes.add_textbox(Inches(1), Inches(0.3), Inches(8), Inches(1))
-                    code_title_frame = code_title_box.text_frame
-                    code_title_frame.text = "Code Example"
-                    code_title_p = code_title_frame.paragraphs[0]
-                    code_title_p.font.bold = True
-                    code_title_p.font.size = Pt(32)
-                    code_title_p.alignment = PP_ALIGN.CENTER
-
-                    code_box = code_slide.shapes.add_textbox(Inches(1), Inches(1.5), Inches(8), Inches(5))
-                    code_tf = code_box.text_frame
-                    code_tf.word_wrap = True
-                    code_tf.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
-                    p = code_tf.add_paragraph()
-                    p.text = code
-                    p.font.name = 'Courier New'
-                    p.font.size = Pt(10)
-                    p.font.color.rgb = RGBColor(255, 255, 255)
-                    p.font.fill.solid()
-                    p.font.fill.fore_color.rgb = RGBColor(40, 40, 40)
-            elif line:
-                p = tf.add_paragraph()
-                p.text = line
-                p.font.size = Pt(20)
-
-        # Add an image to the slide if available
-        if image_paths and image_index < len(image_paths):
-            try:
-                img_path = image_paths[image_index]
-
-                # Define the dimensions for the image
-                left = Inches(6.5)  # Place the image on the right side
-                top = Inches(1)  # Align the image with the top of the content
-                width = Inches(3)  # Elongated width
-                height = Inches(4)  # Elongated height
-
-                # Add the image to the slide
-                slide.shapes.add_picture(img_path, left, top, width, height)
-            except FileNotFoundError:
-                print(f"Image file not found: {img_path}")
-            except Exception as e:
-                print(f"Error adding image: {e}")
-            image_index += 1
+        # The image is added once it has arrived, see _place_images
+        if slide_index in images:
+            image_slots[slide_index] = slide
+
+        # Code that accompanies bullet points goes on its own slide(s) right after
+        for block in slide_ir.code_blocks:
+            _add_code_slide(prs, blank_slide_layout, "Code Example", block.code)
+
+        if progress is not None:
+            progress("slide", index=slide_index, title=slide_ir.title)
+
+    metrics.observe("slide_render", time.perf_counter() - render_start)
+
+    with metrics.timed("image_wait"):
+        _place_images(image_slots, images, image_timeout)
 
     # Save the presentation
-    prs.save(output_filename)
-    print(f"Presentation saved to {output_filename}")
+    with metrics.timed("save"):
+        prs.save(output)
+    print(f"Presentation saved to {output if isinstance(output, str) else 'stream'}")
+
+def create_presentation(topic, template_choice=1, include_code=False, use_cache=True, batch=None, mode=None,
+                        progress=None, request_id=None, profile=False, output=None):
+    """Create a presentation based on topic and template choice
+
+    topic may be a list, giving one deck with a section per topic; batch
+    combines the topics' LLM calls (see gptText.structured) and mode picks
+    the generation mode (see gettext).
+    progress, if given, is called as progress(event, **data) at every stage.
+    Stage timings are logged as one JSON line tagged with request_id
+    (the presentation ID when not given). With profile=True the job runs
+    under a sampling profiler whose speedscope file is stored next to the deck.
+    The deck goes into the deck store, or is written straight to `output`
+    (a writable binary file) when one is given.
+    """
+    # Convert topic to list if it's a string
+    topic_list = [topic] if isinstance(topic, str) else topic
+    
+    # Generate a unique filename for the presentation
+    presentation_id = deckstore.new_deck_id()
     
-    # Clean up the images directory
-    if os.path.exists('images'):
+    with metrics.request_timings(request_id or presentation_id, presentation_id=presentation_id, topic=topic_list):
+        profiler = nullcontext()
+        if profile:
+            profiler = profiling.profile(presentation_id, config.PROFILE_INTERVAL_MS / 1000)
         try:
-            for filename in os.listdir('images'):
-                file_path = os.path.join('images', filename)
-                os.remove(file_path)
-            os.rmdir('images')
-        except OSError as e:
-            print(f"Failed to cleanup 'images' directory: {e}")
+            with metrics.timed("generation"), profiler as active_profiler:
+                result = _build_presentation(presentation_id, topic_list, template_choice, include_code,
+                                             use_cache, batch, mode, progress, output)
+        except Exception:
+            metrics.GENERATIONS.inc(outcome="failed")
+            raise
+    metrics.GENERATIONS.inc(outcome="done")
+    if profile:
+        deck_store.put_artifact(presentation_id, "speedscope.json",
+                                json.dumps(active_profiler.to_speedscope()).encode())
+        result["profile_url"] = f"/api/profiles/{presentation_id}"
+    return result
+
+def _build_presentation(presentation_id, topic_list, template_choice, include_code, use_cache, batch, mode, progress,
+                        output=None):
+    # Every job gets its own workspace so concurrent jobs never touch each other's images
+    workspace = tempfile.mkdtemp(prefix="pptgen-", dir=config.WORKSPACE_ROOT)
+    output_path = None
+    image_pool = ThreadPoolExecutor(max_workers=config.IMAGE_FETCH_WORKERS)
+    try:
+        # Get slide data, then render text slides while the images download
+        deck = gettext(topic_list, include_code, use_cache, progress, batch, mode)
+        image_stats = {}
+        image_futures = getphoto(deck, workspace, image_pool, image_stats, progress)
+        if output is not None:
+            render_presentation(deck, image_futures, template_choice, output, progress)
+        else:
+            # Saved in memory and handed to the store in one write; only complete decks are stored
+            buffer = io.BytesIO()
+            render_presentation(deck, image_futures, template_choice, buffer, progress)
+            output_path = deck_store.add(presentation_id, buffer.getvalue(), topic=topic_list,
+                                         template=template_choice, include_code=include_code)
+    finally:
+        # Downloads that missed the deadline are abandoned, not waited for
+        image_pool.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    downloaded = image_stats.get("downloaded_bytes", 0)
+    embedded = image_stats.get("embedded_bytes", 0)
+    print(f"Images: downloaded {downloaded} bytes, embedded {embedded} bytes "
+          f"(saved {downloaded - embedded} bytes by downscaling)")
+    if progress is not None:
+        progress("saved", presentation_id=presentation_id, filename=f"{presentation_id}.pptx")
     
     return {
         "id": presentation_id,
         "filename": f"{presentation_id}.pptx",
-        "path": output_filename
+        "path": output_path,
+        "image_bytes": {
+            "downloaded": downloaded,
+            "embedded": embedded,
+            "saved": downloaded - embedded
+        }
     }
 
 # API Routes for React Frontend
 
+@app.before_request
+def _assign_request_id():
+    # Reuse the caller's ID so logs can be joined across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+@app.after_request
+def _return_request_id(response):
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    return response
+
+def _flag(value):
+    """Booleans arrive as JSON values or as query-string text."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def _generation_args(data):
+    """Positional arguments for create_presentation from a request body or query string.
+
+    topic may be a list in JSON, or repeated (?topic=a&topic=b) in a query string.
+    """
+    topic = data.get('topic')
+    if hasattr(data, 'getlist') and len(data.getlist('topic')) > 1:
+        topic = data.getlist('topic')
+    batch = data.get('batchTopics')
+    return (
+        topic,
+        int(data.get('template', 1)),
+        _flag(data.get('includeCode', False)),
+        not _flag(data.get('bypassCache', False)),
+        None if batch is None else _flag(batch),
+        data.get('mode'),
+    )
+
+def _coalesce_key(args):
+    """Requests with the same normalized topics and options produce the same deck."""
+    topic, template, include_code, _, batch, mode = args
+    topics = [topic] if isinstance(topic, str) else list(topic)
+    return json.dumps([
+        [" ".join(str(t).lower().split()) for t in topics],
+        template,
+        include_code,
+        config.LLM_BATCH_TOPICS if batch is None else batch,
+        mode or config.GENERATION_MODE,
+    ])
+
+def _profile_requested(data):
+    """Profile when asked to (X-Profile header, ?profile= or a profile field) or when sampled, if enabled."""
+    if not config.PROFILING_ENABLED:
+        return False
+    flag = request.headers.get('X-Profile', request.args.get('profile', data.get('profile')))
+    if flag is not None:
+        return _flag(flag)
+    return random.random() < config.PROFILE_SAMPLE_RATE
+
+def _generation_job(*args, **kwargs):
+    """create_presentation for a queued job, keeping only what clients may see (no server paths)."""
+    result = create_presentation(*args, **kwargs)
+    return {key: result[key] for key in ("id", "filename", "profile_url") if key in result}
+
+def _submit_generation(args, profile=False):
+    """Queue create_presentation(*args), sharing one job between identical requests.
+
+    Returns (job, created); bypassCache and profiled requests always get a
+    job of their own.
+    """
+    use_cache = args[3]
+    if profile:
+        return job_queue.submit_with_progress(_generation_job, *args, request_id=g.request_id,
+                                              profile=True), True
+    if not config.COALESCE_REQUESTS or not use_cache:
+        return job_queue.submit_with_progress(_generation_job, *args, request_id=g.request_id), True
+    key = _coalesce_key(args)
+    job, created = job_queue.submit_shared(key, _generation_job, *args, request_id=g.request_id)
+    # A reused result is only good while its deck is still stored
+    if job.status == DONE and deck_store.get(job.result["id"]) is None:
+        job_queue.forget(key)
+        job, created = job_queue.submit_shared(key, _generation_job, *args, request_id=g.request_id)
+    return job, created
+
+def _queue_full_response(error):
+    """429 while saturated, 503 while draining, both with Retry-After."""
+    status = 503 if isinstance(error, QueueClosed) else 429
+    response = jsonify({"error": str(error), "retry_after": error.retry_after})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, status
+
+def _event_stream(job, start=0):
+    """Server-Sent Events response relaying a job's progress events."""
+    def generate():
+        for item in job.iter_events(start):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            index, event, data = item
+            yield f"id: {index}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/api/generate', methods=['POST'])
 def api_generate():
-    """API endpoint for generating presentations"""
-    global current_presentation
-    
+    """API endpoint for queueing a presentation generation job"""
     try:
         data = request.get_json()
         
         if not data or 'topic' not in data:
             return jsonify({"error": "Topic is required"}), 400
         
-        topic = data.get('topic')
-        template = int(data.get('template', 1))
-        include_code = data.get('includeCode', False)
-        
-        # Generate presentation
-        presentation_info = create_presentation(topic, template, include_code)
-        current_presentation = presentation_info
+        # Queue the generation (or join an identical one) and return straight away
+        job, created = _submit_generation(_generation_args(data), _profile_requested(data))
         
         return jsonify({
-            "message": "Presentation created successfully!",
-            "presentation_id": presentation_info["id"],
-            "filename": presentation_info["filename"]
-        }), 200
+            "message": "Presentation job queued" if created else "Joined an identical presentation job",
+            "coalesced": not created,
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "events_url": f"/api/jobs/{job.id}/events"
+        }), 202
+    
+    except QueueFull as e:
+        return _queue_full_response(e)
     
     except Exception as e:
-        print(f"Error generating presentation: {str(e)}")
+        print(f"Error queueing presentation: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/result', methods=['GET'])
-def api_result():
-    """API endpoint to get information about the current presentation"""
-    global current_presentation
+@app.route('/api/generate/stream', methods=['GET', 'POST'])
+def api_generate_stream():
+    """API endpoint that queues a generation job and streams its progress as SSE"""
+    try:
+        data = request.get_json(silent=True) if request.method == 'POST' else request.args
+        
+        if not data or not data.get('topic'):
+            return jsonify({"error": "Topic is required"}), 400
+        
+        job, _ = _submit_generation(_generation_args(data), _profile_requested(data))
+        return _event_stream(job)
     
-    if current_presentation:
+    except QueueFull as e:
+        return _queue_full_response(e)
+    
+    except Exception as e:
+        print(f"Error queueing presentation: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def api_job_events(job_id):
+    """API endpoint to (re)attach to a job's progress stream"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # EventSource sends the last id it saw when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    return _event_stream(job, start)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """API endpoint to poll the status of a generation job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    info = job.to_dict()
+    if job.status == DONE:
+        info["presentation_id"] = job.result["id"]
+        info["filename"] = job.result["filename"]
+    return jsonify(info), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_job_result(job_id):
+    """API endpoint to get the presentation produced by a finished job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if job.status == DONE:
         return jsonify({
-            "presentation_id": current_presentation["id"],
-            "filename": current_presentation["filename"]
+            "message": "Presentation created successfully!",
+            "presentation_id": job.result["id"],
+            "filename": job.result["filename"]
         }), 200
+    elif job.status == FAILED:
+        return jsonify({"error": job.error}), 500
     else:
-        return jsonify({"error": "No presentation has been generated yet"}), 404
+        return jsonify(job.to_dict()), 202
 
 @app.route('/api/download/<presentation_id>', methods=['GET'])
 def api_download(presentation_id):
-    """API endpoint to download a generated presentation"""
-    filename = f"{presentation_id}.pptx"
-    file_path = os.path.join(OUTPUT_FOLDER, filename)
+    """API endpoint to download a generated presentation
+
+    Decks never change once stored, so the content hash is a strong ETag and
+    responses may be cached for good. If-None-Match (304) and Range requests
+    are handled by send_file.
+    """
+    if not deckstore.valid_deck_id(presentation_id):
+        return jsonify({"error": "Invalid presentation id"}), 400
+
+    entry = deck_store.get(presentation_id)
     
-    if os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True, download_name=filename)
+    if entry is not None:
+        # Filesystem decks are sent from disk; other backends' bytes are sent from memory,
+        # and not fetched at all when the client's copy is current (send_file answers 304)
+        if entry["path"]:
+            source = entry["path"]
+        elif request.if_none_match.contains(entry["sha256"]):
+            source = io.BytesIO()
+        else:
+            source = io.BytesIO(deck_store.read(presentation_id) or b"")
+        response = send_file(source, mimetype=deckstore.PPTX_MIMETYPE, as_attachment=True,
+                             download_name=entry["filename"], conditional=True, etag=entry["sha256"],
+                             max_age=config.DECK_CACHE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
     else:
         return jsonify({"error": "Presentation not found"}), 404
 
+def _queue_gauge(field):
+    return lambda: job_queue.stats()[field]
+
+metrics.gauge("pptgen_jobs_active", "Generation jobs queued or running.", callback=_queue_gauge("active"))
+metrics.gauge("pptgen_jobs_queued", "Generation jobs waiting for a worker.", callback=_queue_gauge("queued"))
+metrics.gauge("pptgen_job_seconds_average", "Moving average of generation job duration.",
+              callback=_queue_gauge("average_seconds"))
+metrics.gauge("pptgen_deck_store_bytes", "Bytes of generated decks in the deck store.",
+              callback=lambda: deck_store.stats()["bytes"])
+
+@app.route('/api/profiles/<presentation_id>', methods=['GET'])
+def api_profile(presentation_id):
+    """API endpoint to download a profiled generation's speedscope file"""
+    if not deckstore.valid_deck_id(presentation_id):
+        return jsonify({"error": "Invalid presentation id"}), 400
+
+    data = deck_store.get_artifact(presentation_id, "speedscope.json")
+    if data is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(io.BytesIO(data), mimetype='application/json', as_attachment=True,
+                     download_name=f"{presentation_id}.speedscope.json")
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/health', methods=['GET'])
+def api_health():
+    """Health check; reports 503 while draining so load balancers stop sending traffic"""
+    stats = job_queue.stats()
+    status = "draining" if stats["draining"] else "ok"
+    return jsonify({"status": status, "jobs": stats}), 503 if stats["draining"] else 200
+
 @app.route('/')
 def index():
     """Render the main page - for direct browser access"""
@@ -287,4 +649,5 @@ def index():
     return render_template('index.html', templates=templates)
 
 if __name__ == '__main__':
+    warm_up()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+# Profiler of the request running in this context, see attach_thread()
+_current = contextvars.ContextVar("pptgen_profiler", default=None)
+
+
+class SamplingProfiler:
+    """Samples the stacks of one request's threads at a fixed interval.
+
+    Only threads attached to the profiler are sampled: the thread that
+    started it, plus pool threads while they run work for the same request
+    (metrics.propagate attaches them). Other requests running at the same
+    time stay out of the profile. The result is a speedscope document with
+    one sampled profile per thread.
+    """
+
+    def __init__(self, interval=0.005, name="profile"):
+        self.interval = interval
+        self.name = name
+        self.started = None
+        self.stopped = None
+        self._threads = {}
+        self._samples = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def attach(self, ident=None, name=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads[ident or thread.ident] = name or thread.name
+
+    def detach(self, ident=None):
+        with self._lock:
+            self._threads.pop(ident or threading.get_ident(), None)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.attach()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.stopped = time.perf_counter()
+
+    def _frame_index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            frames = sys._current_frames()
+            with self._lock:
+                threads = dict(self._threads)
+            for ident, thread_name in threads.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    stack.reverse()
+                    self._samples.setdefault(thread_name, []).append((stack, weight))
+
+    def to_speedscope(self):
+        frames = [None] * len(self._frames)
+        for (function, filename, line), index in self._frames.items():
+            frames[index] = {"name": function, "file": filename, "line": line}
+        profiles = []
+        for thread_name, samples in self._samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weight for _, weight in samples),
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "pptgen",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def save(self, path):
+        partial_path = f"{path}.part"
+        with open(partial_path, "w") as file:
+            json.dump(self.to_speedscope(), file)
+        os.replace(partial_path, path)
+        return path
+
+
+@contextlib.contextmanager
+def profile(name="profile", interval=0.005):
+    """Profile the block (and the pool work it hands out) with a SamplingProfiler."""
+    profiler = SamplingProfiler(interval, name)
+    token = _current.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def attach_thread():
+    """Sample the current thread too while it works for the profiled request, if any."""
+    profiler = _current.get()
+    if profiler is None:
+        yield
+        return
+    profiler.attach()
+    try:
+        yield
+    finally:
+        profiler.detach()
@@ -0,0 +1,148 @@
+import threading
+import time
+
+
+class SystemClock:
+    """Real monotonic time."""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class FakeClock:
+    """Manually driven clock so rate-limit scheduling can be checked offline.
+
+    sleep() does not block; it just moves time forward, and the total time
+    spent sleeping is recorded in `slept`.
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+        self.slept = 0.0
+
+    def now(self):
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+                self.slept += seconds
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += seconds
+
+
+class TokenBucket:
+    """Bucket holding up to `capacity` units, refilled evenly over `period` seconds.
+
+    Reservations may take the level below zero; the caller then has to wait
+    for the debt to be refilled, which keeps callers in FIFO order without
+    holding the lock while sleeping.
+    """
+
+    def __init__(self, capacity, period, now):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, amount, now):
+        """Take `amount` units and return how long to wait before using them."""
+        self._refill(now)
+        # A single request larger than the bucket can never fit, so only ask
+        # it to wait for a full bucket.
+        amount = min(amount, self.capacity)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def consume(self, amount, now):
+        """Take `amount` units after the fact without waiting."""
+        self._refill(now)
+        self.level -= amount
+
+
+class RateLimiter:
+    """Thread-safe requests-per-minute and tokens-per-minute budget.
+
+    Calls only wait when a budget is actually exhausted; threads waiting in
+    acquire() are served in the order they asked.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None, clock=None):
+        self.clock = clock or SystemClock()
+        now = self.clock.now()
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute, 60.0, now)
+        self._tokens = TokenBucket(tokens_per_minute, 60.0, now) if tokens_per_minute else None
+        self._paused_until = now
+
+    def reserve(self, tokens=0):
+        """Reserve one request plus `tokens` tokens; returns the delay in seconds."""
+        with self._lock:
+            now = self.clock.now()
+            wait = self._requests.reserve(1, now)
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            return max(wait, self._paused_until - now)
+
+    def acquire(self, tokens=0):
+        wait = self.reserve(tokens)
+        self.clock.sleep(wait)
+        return wait
+
+    def consume(self, tokens):
+        """Charge tokens that were only known after the call (e.g. the response)."""
+        if self._tokens is None or not tokens:
+            return
+        with self._lock:
+            self._tokens.consume(tokens, self.clock.now())
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, e.g. after the API returned 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock.now() + seconds)
+
+
+class ProxyLimiter:
+    """RateLimiter interface over a limiter living in another process.
+
+    `remote` is e.g. a multiprocessing manager proxy of a RateLimiter, so
+    several processes draw on one budget. Only reserve/consume/pause cross
+    the process boundary; the waiting itself happens locally.
+    """
+
+    def __init__(self, remote, clock=None):
+        self.remote = remote
+        self.clock = clock or SystemClock()
+
+    def reserve(self, tokens=0):
+        return self.remote.reserve(tokens)
+
+    def acquire(self, tokens=0):
+        wait = self.reserve(tokens)
+        self.clock.sleep(wait)
+        return wait
+
+    def consume(self, tokens):
+        self.remote.consume(tokens)
+
+    def pause(self, seconds):
+        self.remote.pause(seconds)
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (roughly four characters per token)."""
+    return max(1, len(text) // 4)
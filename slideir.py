@@ -0,0 +1,228 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Header lines are matched after stripping markdown emphasis such as "**" or "##"
+SLIDE_HEADER = re.compile(r"Slide\s*\d+\s*:\s*(.*)", re.IGNORECASE)
+TITLE_HEADER = re.compile(r"Title\s*:\s*(.*)", re.IGNORECASE)
+IMAGE_LINE = re.compile(r"Image Suggestion\s*:\s*(.*)", re.IGNORECASE)
+SEPARATOR = re.compile(r"-{3,}")
+JSON_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+# A whole outline wrapped in one bare fence; greedy, so code fences inside survive
+OUTLINE_FENCE = re.compile(r"^\s*```(?:text|markdown|md)?[ \t]*\n(.*)\n[ \t]*```\s*$", re.DOTALL | re.IGNORECASE)
+
+# Shape of a deck produced by a single structured-output call
+DECK_SCHEMA = {
+    "type": "object",
+    "required": ["title", "slides"],
+    "additionalProperties": False,
+    "properties": {
+        "title": {"type": "string", "minLength": 1},
+        "slides": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "required": ["title", "bullets"],
+                "additionalProperties": False,
+                "properties": {
+                    "title": {"type": "string", "minLength": 1},
+                    "bullets": {"type": "array", "items": {"type": "string"}},
+                    "code": {"type": "string"},
+                    "language": {"type": "string"},
+                    "image_query": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+
+@dataclass(slots=True)
+class CodeBlock:
+    code: str
+    language: str = ""
+
+
+@dataclass(slots=True)
+class Slide:
+    title: str
+    bullets: List[str] = field(default_factory=list)
+    code_blocks: List[CodeBlock] = field(default_factory=list)
+    image_query: Optional[str] = None
+    # Divider slide that opens one topic's section in a multi-topic deck
+    section: bool = False
+
+    @property
+    def code_only(self):
+        """A slide that holds nothing but code (e.g. "Slide 4: Code Example")."""
+        return bool(self.code_blocks) and not self.bullets
+
+
+@dataclass(slots=True)
+class Deck:
+    title: Optional[str] = None
+    slides: List[Slide] = field(default_factory=list)
+
+    def image_queries(self):
+        """Slide index -> image query for every slide that shows an image."""
+        return {index: slide.image_query for index, slide in enumerate(self.slides)
+                if slide.image_query and not slide.code_only and not slide.section}
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "slides": [
+                {
+                    "title": slide.title,
+                    "bullets": list(slide.bullets),
+                    "code_blocks": [{"code": block.code, "language": block.language}
+                                    for block in slide.code_blocks],
+                    "image_query": slide.image_query,
+                    "section": slide.section,
+                }
+                for slide in self.slides
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            title=data.get("title"),
+            slides=[
+                Slide(
+                    title=slide.get("title") or "Slide",
+                    bullets=list(slide.get("bullets", [])),
+                    code_blocks=[CodeBlock(block["code"], block.get("language", ""))
+                                 for block in slide.get("code_blocks", [])],
+                    image_query=slide.get("image_query"),
+                    section=bool(slide.get("section", False)),
+                )
+                for slide in data.get("slides", [])
+            ],
+        )
+
+
+def combine(sections, title=None):
+    """One Deck from (section title, Deck) pairs, each opened by a divider slide."""
+    deck = Deck(title=title)
+    for section_title, section in sections:
+        deck.slides.append(Slide(section_title, section=True))
+        deck.slides.extend(section.slides)
+    return deck
+
+
+def _clean(line):
+    return line.strip().strip("*#_ ").strip()
+
+
+def parse_outline(text):
+    """Parse the LLM outline text into a Deck in a single pass over its lines.
+
+    Slides start at a "Slide N: title" header or after a "---" separator.
+    Fenced code blocks are kept verbatim, so a "---" or "Slide" line inside
+    code never ends the slide, and every block on a slide is collected.
+    Code blocks only start after the first slide header; an outline wrapped
+    in a single bare fence is unwrapped first.
+    """
+    fenced = OUTLINE_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    deck = Deck()
+    slide = None
+    seen_header = False
+    code_lines = None
+    language = ""
+
+    for raw in text.splitlines():
+        line = raw.strip()
+
+        if code_lines is not None:
+            if line.startswith("```"):
+                if slide is None:
+                    slide = Slide("Slide")
+                    deck.slides.append(slide)
+                slide.code_blocks.append(CodeBlock("\n".join(code_lines).strip("\n"), language))
+                code_lines = None
+            else:
+                code_lines.append(raw.rstrip())
+            continue
+
+        if not line:
+            continue
+        if line.startswith("```"):
+            # A stray fence before any slide is formatting, not code
+            if seen_header:
+                language = line[3:].strip()
+                code_lines = []
+            continue
+        if SEPARATOR.fullmatch(line):
+            slide = None
+            continue
+
+        cleaned = _clean(line)
+        header = SLIDE_HEADER.match(cleaned)
+        if header:
+            slide = Slide(_clean(header.group(1)) or "Slide")
+            deck.slides.append(slide)
+            seen_header = True
+            continue
+        if deck.title is None and not deck.slides:
+            title = TITLE_HEADER.match(cleaned)
+            if title:
+                deck.title = _clean(title.group(1))
+                continue
+
+        if slide is None:
+            slide = Slide("Slide")
+            deck.slides.append(slide)
+        image = IMAGE_LINE.match(cleaned)
+        if image:
+            slide.image_query = image.group(1).strip()
+        elif line[0] in "-•" or line.startswith("* "):
+            bullet = line[1:].strip()
+            if bullet:
+                slide.bullets.append(bullet)
+        else:
+            slide.bullets.append(line)
+
+    # An unterminated fence still belongs to the last slide
+    if code_lines:
+        if slide is None:
+            slide = Slide("Slide")
+            deck.slides.append(slide)
+        slide.code_blocks.append(CodeBlock("\n".join(code_lines).strip("\n"), language))
+
+    return deck
+
+
+def parse_json(text):
+    """Parse and validate a DECK_SCHEMA document into a Deck.
+
+    Raises ValueError with a short description when the text is not JSON or
+    does not match the schema.
+    """
+    import jsonschema  # slow to import and only needed in single-shot mode
+    fenced = JSON_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+        jsonschema.validate(data, DECK_SCHEMA)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}") from e
+    except jsonschema.ValidationError as e:
+        location = "/".join(str(part) for part in e.absolute_path) or "document"
+        raise ValueError(f"schema violation at {location}: {e.message}") from e
+
+    deck = Deck(title=data["title"].strip())
+    for item in data["slides"]:
+        slide = Slide(item["title"].strip(),
+                      bullets=[bullet.strip() for bullet in item["bullets"] if bullet.strip()],
+                      image_query=(item.get("image_query") or "").strip() or None)
+        code = (item.get("code") or "").strip("\n")
+        if code.strip():
+            slide.code_blocks.append(CodeBlock(code, item.get("language", "python")))
+        deck.slides.append(slide)
+    return deck
@@ -0,0 +1,37 @@
+import threading
+
+import deckstore
+
+
+def run_with_timeout(function, seconds=5):
+    """Result of function(), failing instead of hanging if it deadlocks."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", function()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), f"{function} did not return within {seconds}s"
+    return result["value"]
+
+
+def legacy_store(tmp_path, **options):
+    # A deck written before the index existed (or after the index was removed)
+    (tmp_path / "presentation_legacy.pptx").write_bytes(b"old deck")
+    return deckstore.DeckStore(deckstore.FilesystemBackend(str(tmp_path)), **options)
+
+
+def test_get_adopts_unindexed_deck(tmp_path):
+    store = legacy_store(tmp_path)
+    deck = run_with_timeout(lambda: store.get("presentation_legacy"))
+    assert deck["size"] == len(b"old deck")
+    assert deck["path"] == str(tmp_path / "presentation_legacy.pptx")
+
+
+def test_collect_with_unindexed_deck(tmp_path):
+    store = legacy_store(tmp_path, max_age=0, max_bytes=1)
+    assert run_with_timeout(store.collect) == (1, len(b"old deck"))
+    assert not (tmp_path / "presentation_legacy.pptx").exists()
+
+
+def test_stats_with_unindexed_deck(tmp_path):
+    store = legacy_store(tmp_path)
+    assert run_with_timeout(store.stats) == {"decks": 1, "bytes": len(b"old deck")}
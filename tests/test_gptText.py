@@ -0,0 +1,17 @@
+import gptText
+
+FENCE = "```"
+
+
+def test_valid_outline_accepts_titled_slides():
+    assert gptText._valid_outline("Title: Caching\nSlide 1: Why cache\n- Fewer slow calls")
+    assert gptText._valid_outline(f"{FENCE}\nSlide 1: Why cache\n- Fewer slow calls\n{FENCE}")
+
+
+def test_valid_outline_rejects_outline_without_slide_headers():
+    assert not gptText._valid_outline("- Fewer slow calls\n- Lower cost")
+    assert not gptText._valid_outline(f"{FENCE}\nprint('hello')\n{FENCE}")
+
+
+def test_valid_outline_rejects_single_untitled_code_slide():
+    assert not gptText._valid_outline(f"Slide 1:\n{FENCE}python\nprint('hello')\n{FENCE}")
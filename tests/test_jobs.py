@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+import jobs
+
+
+def blocking_job(release):
+    def run(progress=None):
+        release.wait(5)
+        return "done"
+    return run
+
+
+def test_refused_shared_job_is_not_handed_out():
+    release = threading.Event()
+    job_queue = jobs.JobQueue(workers=1, max_active=1)
+    try:
+        running, created = job_queue.submit_shared("a", blocking_job(release))
+        assert created
+        with pytest.raises(jobs.QueueFull):
+            job_queue.submit_shared("b", blocking_job(release))
+        # The refused key must not attach later callers to a job that never ran
+        with pytest.raises(jobs.QueueFull):
+            job_queue.submit_shared("b", blocking_job(release))
+        release.set()
+        assert running.wait(5)
+        job, created = job_queue.submit_shared("b", blocking_job(release))
+        assert created
+        assert job.wait(5) and job.status == jobs.DONE
+    finally:
+        release.set()
+        job_queue.shutdown()
+
+
+def test_concurrent_shared_submits_only_return_queued_jobs():
+    release = threading.Event()
+    job_queue = jobs.JobQueue(workers=2, max_active=2)
+    start = threading.Barrier(16)
+    returned = []
+
+    def submit(number):
+        start.wait()
+        try:
+            returned.append(job_queue.submit_shared(f"key-{number % 4}", blocking_job(release))[0])
+        except jobs.QueueFull:
+            pass
+
+    threads = [threading.Thread(target=submit, args=(number,)) for number in range(16)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert returned
+        for job in returned:
+            assert job_queue.get(job.id) is job
+        release.set()
+        assert all(job.wait(5) and job.status == jobs.DONE for job in returned)
+    finally:
+        release.set()
+        job_queue.shutdown()
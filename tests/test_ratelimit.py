@@ -0,0 +1,69 @@
+import pytest
+
+import ratelimit
+
+
+def make_limiter(requests_per_minute, tokens_per_minute=None):
+    clock = ratelimit.FakeClock()
+    return ratelimit.RateLimiter(requests_per_minute, tokens_per_minute, clock=clock), clock
+
+
+def test_requests_within_budget_do_not_wait():
+    limiter, clock = make_limiter(3)
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0]
+    assert clock.slept == 0
+
+
+def test_request_over_rpm_waits_for_refill():
+    limiter, clock = make_limiter(2)
+    limiter.acquire()
+    limiter.acquire()
+    # Two requests per minute refill one every 30 seconds
+    assert limiter.acquire() == pytest.approx(30)
+    assert limiter.acquire() == pytest.approx(30)
+    assert clock.slept == pytest.approx(60)
+
+
+def test_budget_refills_with_time():
+    limiter, clock = make_limiter(2)
+    limiter.acquire()
+    limiter.acquire()
+    clock.advance(60)
+    assert limiter.acquire() == 0
+
+
+def test_tokens_over_tpm_wait():
+    limiter, _ = make_limiter(100, 600)
+    assert limiter.acquire(600) == 0
+    # 600 tokens per minute refill 10 per second
+    assert limiter.acquire(100) == pytest.approx(10)
+
+
+def test_consumed_response_tokens_count_against_budget():
+    limiter, _ = make_limiter(100, 600)
+    limiter.acquire(100)
+    limiter.consume(500)
+    assert limiter.acquire(50) == pytest.approx(5)
+
+
+def test_request_larger_than_tpm_waits_for_a_full_bucket_only():
+    limiter, _ = make_limiter(100, 600)
+    limiter.acquire(600)
+    assert limiter.acquire(6000) == pytest.approx(60)
+
+
+def test_pause_after_429_holds_back_every_caller():
+    limiter, clock = make_limiter(100)
+    limiter.acquire()
+    limiter.pause(5)
+    assert limiter.reserve() == pytest.approx(5)
+    assert limiter.acquire() == pytest.approx(5)
+    assert clock.now() == pytest.approx(5)
+    assert limiter.acquire() == 0
+
+
+def test_pause_never_shortens_an_earlier_pause():
+    limiter, _ = make_limiter(100)
+    limiter.pause(10)
+    limiter.pause(2)
+    assert limiter.acquire() == pytest.approx(10)
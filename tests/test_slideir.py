@@ -0,0 +1,48 @@
+import slideir
+
+FENCE = "```"
+
+OUTLINE = f"""Title: Caching
+Slide 1: Why cache
+- Fewer slow calls
+- Lower cost
+Image Suggestion: A warehouse shelf
+---
+Slide 2: Code Example
+{FENCE}python
+cache = {{}}
+---
+print(cache)
+{FENCE}
+{FENCE}bash
+redis-cli ping
+{FENCE}
+---
+Slide 3: Wrap-up
+- Measure first"""
+
+
+def test_outline_wrapped_in_bare_fence():
+    deck = slideir.parse_outline(f"{FENCE}\n{OUTLINE}\n{FENCE}")
+    assert deck.title == "Caching"
+    assert [slide.title for slide in deck.slides] == ["Why cache", "Code Example", "Wrap-up"]
+    assert deck.slides[0].bullets == ["Fewer slow calls", "Lower cost"]
+    assert [block.language for block in deck.slides[1].code_blocks] == ["python", "bash"]
+
+
+def test_separator_inside_code_block_does_not_end_slide():
+    deck = slideir.parse_outline(OUTLINE)
+    assert len(deck.slides) == 3
+    assert deck.slides[1].code_blocks[0].code == "cache = {}\n---\nprint(cache)"
+
+
+def test_two_code_blocks_on_one_slide():
+    slide = slideir.parse_outline(OUTLINE).slides[1]
+    assert slide.code_only
+    assert [block.code for block in slide.code_blocks] == ["cache = {}\n---\nprint(cache)", "redis-cli ping"]
+
+
+def test_fence_before_first_slide_is_not_code():
+    deck = slideir.parse_outline(f"{FENCE}\n{OUTLINE}")
+    assert [slide.title for slide in deck.slides] == ["Why cache", "Code Example", "Wrap-up"]
+    assert not deck.slides[0].code_blocks
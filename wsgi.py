@@ -0,0 +1,10 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app"""
+import threading
+import pptgen
+
+# Load templates and open shared clients in the background, so a fresh worker
+# answers requests (health checks first of all) without waiting for them.
+# Calls that need them before warm-up finishes load them on demand.
+threading.Thread(target=pptgen.warm_up, name="warm-up", daemon=True).start()
+
+app = pptgen.app